@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Per-point cost of building point cloud instancers.
+
+Run with `python benchmarks/benchmark_point_cloud.py`, the repository root is
+added to the module search path so the package does not need to be installed.
+"""
+
+import pathlib
+import sys
+import time
+
+import bpy
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from blender_kitti.particles import _create_instancer_obj
+
+NUM_POINTS = [10_000, 100_000, 1_000_000]
+
+
+def benchmark_instancer(num_points: int, name_prefix: str):
+    rng = np.random.default_rng(0)
+    points = rng.normal(scale=20.0, size=(num_points, 3)).astype(np.float32)
+
+    t_start = time.perf_counter()
+    obj = _create_instancer_obj(
+        points,
+        name_instancer_obj="{}_obj".format(name_prefix),
+        name_mesh="{}_mesh".format(name_prefix),
+    )
+    t_total = time.perf_counter() - t_start
+
+    mesh = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(mesh)
+    return t_total
+
+
+def main():
+    print("{:>10} {:>10} {:>14}".format("points", "total [s]", "per point [us]"))
+    for num_points in NUM_POINTS:
+        t_total = benchmark_instancer(num_points, "bench_{}".format(num_points))
+        print(
+            "{:>10} {:>10.3f} {:>14.3f}".format(
+                num_points, t_total, 1e6 * t_total / num_points
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,18 @@ __author__ = """Christoph Rist"""
 __email__ = "c.rist@posteo.de"
 
 from .blender_kitti import add_objects_from_data, extract_data_tasks_from_file
-from .particles import add_voxels, add_point_cloud, add_flow_mesh, add_boxes
+from .particles import (
+    add_voxels,
+    add_point_cloud,
+    add_flow_mesh,
+    add_boxes,
+    update_point_cloud,
+)
 from .scene_setup import setup_scene, add_cameras_default
 from .system_setup import enable_devices
 from .object_spotlight import add_spotlight_ground
 from .cli import process_file
+from . import furthest_point_sampling
 import numpy as np
 
 
@@ -24,6 +31,7 @@ __all__ = [
     "extract_data_tasks_from_file",
     "process_file",
     "setup_scene",
+    "update_point_cloud",
 ]
 
 
@@ -32,17 +40,12 @@ def calc_distances(p0, points):
 
 
 def furthest_point_sampling_thresh(pts, dist_thresh: float = 0.1):
-    farthest_pts = []
-    farthest_pts_idxs = []
-    first_idx = np.random.randint(len(pts))
-    farthest_pts_idxs.append(first_idx)
-    farthest_pts.append(pts[first_idx])
-    distances = calc_distances(farthest_pts[0], pts)
-    while True:
-        farthest_pt_idx = np.argmax(distances)
-        if distances[farthest_pt_idx] < dist_thresh:
-            break
-        farthest_pts.append(pts[farthest_pt_idx])
-        farthest_pts_idxs.append(farthest_pt_idx)
-        distances = np.minimum(distances, calc_distances(farthest_pts[-1], pts))
-    return np.stack(farthest_pts, axis=0), np.array(farthest_pts_idxs)
+    """See `furthest_point_sampling.furthest_point_sampling_thresh`.
+
+    :param dist_thresh: Threshold of the squared distance
+    :return: sampled points, their indices
+    """
+    indices = furthest_point_sampling.furthest_point_sampling_thresh(
+        pts, np.sqrt(dist_thresh), start_index=np.random.randint(len(pts))
+    )
+    return pts[indices], indices
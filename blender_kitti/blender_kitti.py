@@ -2,17 +2,27 @@
 """
 
 """
+import functools
 import typing
 import logging
 import re
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
 from collections import defaultdict
 from ruamel.yaml import YAML
 
-from .particles import add_point_cloud, add_voxels, add_voxel_list
+from .npz import LazyNpzArray, load_lazy_arrays
+from .particles import (
+    add_point_cloud,
+    add_voxels,
+    add_voxel_list,
+    prepare_point_cloud,
+    prepare_voxels,
+    prepare_voxel_list,
+)
 from .mesh import add_object_from_mesh
 from .scene_setup import setup_scene
 from .object_spotlight import add_spotlight_ground
@@ -45,15 +55,62 @@ data_structures = {
     "mesh": add_object_from_mesh,
 }
 
+# NumPy-only preparation of tasks: prepare_f(**kwargs) -> (build_f, build_kwargs).
+# Only build_f creates Blender data.
+task_preparation = {
+    add_point_cloud: prepare_point_cloud,
+    add_voxels: prepare_voxels,
+    add_voxel_list: prepare_voxel_list,
+}
 
-def add_objects_from_data(tasks: {str: typing.Any}, scene):
 
-    results = {}
-    for instance_name, (task_f, task_kwargs) in tasks.items():
+def _prepare_task(task_f, task_kwargs):
+    # data of the task is only read now
+    task_kwargs = load_lazy_arrays(task_kwargs)
+    try:
+        prepare_f = task_preparation[task_f]
+    except KeyError:
+        return task_f, task_kwargs
+    return prepare_f(**task_kwargs)
+
+
+def add_objects_from_data(
+    tasks: {str: typing.Any}, scene, num_workers: typing.Union[int, None] = None
+):
+    """Execute tasks in two phases.
+
+    Reading and NumPy preparation of all tasks runs in a thread pool while the
+    Blender data is created serially on the calling thread, in task order.
+
+    :param num_workers: Number of preparation threads (default: ThreadPoolExecutor
+        default). 0 prepares every task on the calling thread right before building.
+    """
+    for task_f, task_kwargs in tasks.values():
         if "scene" not in task_kwargs:
             task_kwargs["scene"] = scene
+
+    if num_workers == 0:
+        return _build_tasks(
+            {k: functools.partial(_prepare_task, *v) for k, v in tasks.items()},
+            lambda prepare: prepare(),
+        )
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            instance_name: executor.submit(_prepare_task, task_f, task_kwargs)
+            for instance_name, (task_f, task_kwargs) in tasks.items()
+        }
+        return _build_tasks(futures, lambda future: future.result())
+
+
+def _build_tasks(prepared_tasks: dict, get_prepared) -> dict:
+    results = {}
+    for instance_name in list(prepared_tasks.keys()):
+        # release the prepared data of every task once it is built
+        prepared = prepared_tasks.pop(instance_name)
         try:
-            results[instance_name] = task_f(**task_kwargs)
+            build_f, build_kwargs = get_prepared(prepared)
+            results[instance_name] = build_f(**build_kwargs)
         except ImportError:
             logger.warning(
                 "Imports for '{}' unavailable. Ignoring task.".format(instance_name)
@@ -122,20 +179,32 @@ def extract_config_from_data(data) -> dict:
 
 def extract_data_tasks_from_file(
     filepath: str,
+    mmap_mode: typing.Union[str, None] = None,
 ) -> {str: (typing.Callable, {str: typing.Any})}:
-    logger.info("Processing data file '{}'.".format(filepath))
-    data = np.load(filepath)
+    """Parse the keys of a .npz data file into tasks.
 
-    global_config = extract_config_from_data(data)
+    Task arguments are LazyNpzArray placeholders that are only read when the task
+    is executed by `add_objects_from_data` (see `npz.load_lazy_arrays`), so tasks
+    dropped in between never touch their data.
+
+    :param filepath: .npz data file
+    :param mmap_mode: If given, memory-map uncompressed arrays with this mode
+    """
+    logger.info("Processing data file '{}'.".format(filepath))
+    with np.load(filepath) as data:
+        global_config = extract_config_from_data(data)
+        keys = list(data.keys())
 
     def filter_fn(x):
         if x[1] is None and x[0] != global_config_key:
             logger.warning("Ignoring unknown entry key '{}'.".format(x[0]))
         return x[1] is not None
 
-    matches = [(x, regex_key.fullmatch(x)) for x in data.keys()]
+    matches = [(x, regex_key.fullmatch(x)) for x in keys]
     matches = list(filter(filter_fn, matches))
-    matches = [(data[x[0]], x[1].groups()) for x in matches]
+    matches = [
+        (LazyNpzArray(filepath, x[0], mmap_mode), x[1].groups()) for x in matches
+    ]
 
     x = defaultdict(lambda: defaultdict(dict))
     for d, key in matches:
@@ -177,7 +246,7 @@ def extract_data_tasks_from_file(
         kwargs = task[1]
         try:
             yaml = YAML(typ="safe")
-            kwargs["config"] = yaml.load(kwargs["config"])
+            kwargs["config"] = yaml.load(kwargs["config"].load())
         except KeyError:
             pass
         return task
@@ -3,7 +3,15 @@
 """ """
 
 import click
+import collections
+import glob
 import logging
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
 import typing
 
 import bpy
@@ -14,6 +22,7 @@ from .blender_kitti import (
     make_scene,
     extract_data_tasks_from_file,
 )
+from .datablocks import DatablockRegistry
 from .system_setup import enable_devices
 from .scene_setup import add_cameras_default
 
@@ -44,12 +53,44 @@ def process_file(filename: str, scene=None):
     return scene, global_config
 
 
-def make_scene_from_data_files(render_config: typing.Union[str, None], filenames):
+def _load_render_config(render_config: typing.Union[str, None]) -> dict:
     if render_config is not None:
         yaml = YAML(typ="safe")
-        config = yaml.load(render_config)
+        return yaml.load(render_config)
+    return {}
+
+
+def _apply_whitelist(tasks: dict, config: dict) -> dict:
+    if "whitelist" in config:
+        # only keep the instances that are in the whitelist
+        instance_whitelist = set(config["whitelist"])
+        tasks = dict((k, v) for k, v in tasks.items() if k in instance_whitelist)
+    return tasks
+
+
+def _enable_gpu_rendering(scene):
+    enable_devices()
+    scene.cycles.device = "GPU"
+
+
+# Cycles devices of the render worker
+RENDER_DEVICES = ("GPU", "CPU")
+
+
+def _setup_render_device(scene, device: str, threads: typing.Union[int, None]):
+    if device not in RENDER_DEVICES:
+        raise ValueError("Unknown render device '{}'.".format(device))
+    if device == "GPU":
+        _enable_gpu_rendering(scene)
     else:
-        config = {}
+        scene.cycles.device = "CPU"
+    if threads is not None:
+        scene.render.threads_mode = "FIXED"
+        scene.render.threads = threads
+
+
+def make_scene_from_data_files(render_config: typing.Union[str, None], filenames):
+    config = _load_render_config(render_config)
 
     tasks = {}
 
@@ -57,7 +98,10 @@ def make_scene_from_data_files(render_config: typing.Union[str, None], filenames
         filenames = [filenames]
 
     for filename in filenames:
-        tasks_from_file, config_from_file = extract_data_tasks_from_file(filename)
+        # arrays are only read for tasks that survive the whitelist below
+        tasks_from_file, config_from_file = extract_data_tasks_from_file(
+            filename, mmap_mode="r"
+        )
         # Todo check for conflicts and abort if necessary
         tasks.update(tasks_from_file)
         config.update(config_from_file)
@@ -68,23 +112,354 @@ def make_scene_from_data_files(render_config: typing.Union[str, None], filenames
         logger.warning("Ignoring scene setup.")
         scene = None
 
-    if "whitelist" in config:
-        # only keep the instances that are in the whitelist
-        instance_whitelist = set(config["whitelist"])
-        tasks = dict((k, v) for k, v in tasks.items() if k in instance_whitelist)
-
+    tasks = _apply_whitelist(tasks, config)
     add_objects_from_data(tasks, scene)
 
     enable_gpu_rendering = True
     if enable_gpu_rendering:
-        enable_devices()
-        scene.cycles.device = "GPU"
+        _enable_gpu_rendering(scene)
 
     return scene, config
 
 
-def render_scene():
-    bpy.ops.render.render(write_still=True)
+def expand_sequence_filenames(filenames: typing.Iterable[str]) -> typing.List[str]:
+    """Expand glob patterns. Frames are ordered by filename within each pattern."""
+    expanded = []
+    for filename in filenames:
+        if any(c in filename for c in "*?["):
+            matches = sorted(glob.glob(filename))
+            if not matches:
+                raise FileNotFoundError("No files match '{}'.".format(filename))
+            expanded.extend(matches)
+        else:
+            if not pathlib.Path(filename).is_file():
+                raise FileNotFoundError("Cannot find data file '{}'.".format(filename))
+            expanded.append(filename)
+    return expanded
+
+
+class RenderWorker:
+    """Renders jobs into a scene that is kept alive between jobs.
+
+    Scene, world, cameras and device setup are created for the first job. Every
+    job only creates its data objects, renders and removes them again.
+    """
+
+    def __init__(
+        self,
+        render_config: typing.Union[str, None] = None,
+        device: str = "GPU",
+        threads: typing.Union[int, None] = None,
+    ):
+        """
+        :param device: Cycles device, one of RENDER_DEVICES
+        :param threads: Fixed number of render threads (default: all cores)
+        """
+        self.base_config = _load_render_config(render_config)
+        self.device = device
+        self.threads = threads
+        self.scene = None
+
+    def render(
+        self,
+        filenames: typing.List[str],
+        output: str,
+        render_config: typing.Union[dict, None] = None,
+    ):
+        """Render all data files together into a single image.
+
+        :param render_config: Job specific config, updates the worker config
+        """
+        config = dict(self.base_config)
+        if render_config is not None:
+            config.update(render_config)
+
+        tasks = {}
+        for filename in filenames:
+            tasks_from_file, config_from_file = extract_data_tasks_from_file(
+                filename, mmap_mode="r"
+            )
+            tasks.update(tasks_from_file)
+            config.update(config_from_file)
+
+        if self.scene is None:
+            self.scene = make_scene(config)
+            add_cameras_default(self.scene)
+            _setup_render_device(self.scene, self.device, self.threads)
+
+        job_data = DatablockRegistry()
+        try:
+            with job_data:
+                add_objects_from_data(_apply_whitelist(tasks, config), self.scene)
+
+            self.scene.render.filepath = output
+            logger.info("Rendering '{}'.".format(output))
+            render_scene(self.scene)
+        finally:
+            job_data.remove_all()
+
+
+def _sequence_frames(
+    filenames: typing.List[str], output: str, skip_existing: bool
+) -> typing.List[typing.Tuple[str, str]]:
+    frames = [
+        (filename, output.format(frame=frame, stem=pathlib.Path(filename).stem))
+        for frame, filename in enumerate(filenames)
+    ]
+    if skip_existing:
+        num_frames = len(frames)
+        frames = [f for f in frames if not pathlib.Path(f[1]).exists()]
+        if len(frames) < num_frames:
+            logger.info(
+                "Skipping {} frames with existing output.".format(
+                    num_frames - len(frames)
+                )
+            )
+    return frames
+
+
+def render_sequence(
+    render_config: typing.Union[str, None],
+    filenames: typing.List[str],
+    output: str = "/tmp/blender_kitti_{frame:06d}.png",
+    skip_existing: bool = False,
+    device: str = "GPU",
+    threads: typing.Union[int, None] = None,
+):
+    """Render every data file as one frame of a sequence.
+
+    :param output: Output path, formatted with 'frame' (index) and 'stem' (data
+        file name without suffix)
+    :param skip_existing: Do not render frames whose output exists (resume)
+    """
+    worker = RenderWorker(render_config, device, threads)
+    for filename, frame_output in _sequence_frames(filenames, output, skip_existing):
+        worker.render([filename], frame_output)
+    return worker.scene
+
+
+# job files of the spool directory
+JOB_SUFFIX = ".yaml"
+# seconds between checks of the spool directory (worker) and of the job results
+# (driver of `render_sequence_parallel`)
+SPOOL_POLL_INTERVAL = 0.1
+
+
+def _claim_job(job_path: pathlib.Path) -> typing.Union[pathlib.Path, None]:
+    # rename is atomic, several workers can share a spool directory
+    claimed = job_path.with_name(job_path.name + ".running")
+    try:
+        job_path.rename(claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def _claim_next_job(spool_dir: pathlib.Path) -> typing.Union[pathlib.Path, None]:
+    for job_path in sorted(spool_dir.glob("*" + JOB_SUFFIX)):
+        claimed = _claim_job(job_path)
+        if claimed is not None:
+            return claimed
+    return None
+
+
+def run_spool_job(worker: RenderWorker, job_path: pathlib.Path):
+    """Render a claimed job file and mark it as done or failed.
+
+    Job files are YAML with the keys 'filenames' (list of .npz files rendered into
+    one image), 'output' and optionally 'render_config' (mapping).
+    """
+    base_name = job_path.name[: -len(".running")]
+    try:
+        yaml = YAML(typ="safe")
+        job = yaml.load(job_path)
+        worker.render(job["filenames"], job["output"], job.get("render_config"))
+    except Exception as e:
+        logger.exception("Job '{}' failed.".format(base_name))
+        job_path.with_name(base_name + ".failed").write_text(
+            "{}: {}\n".format(type(e).__name__, e)
+        )
+        job_path.unlink()
+        return False
+
+    job_path.rename(job_path.with_name(base_name + ".done"))
+    return True
+
+
+def serve(
+    spool_dir: str,
+    render_config: typing.Union[str, None] = None,
+    poll_interval: float = SPOOL_POLL_INTERVAL,
+    max_jobs: typing.Union[int, None] = None,
+    device: str = "GPU",
+    threads: typing.Union[int, None] = None,
+):
+    """Render jobs from a spool directory until a file 'stop' appears in it.
+
+    Every '*.yaml' job file is claimed by renaming it to '*.yaml.running' and
+    afterwards renamed to '*.yaml.done' or replaced by '*.yaml.failed' holding the
+    error. The scene, world and devices stay set up between jobs.
+
+    :param max_jobs: Return after this many jobs
+    """
+    spool_dir = pathlib.Path(spool_dir)
+    worker = RenderWorker(render_config, device, threads)
+    num_jobs = 0
+    logger.info("Serving render jobs from '{}'.".format(spool_dir))
+    while max_jobs is None or num_jobs < max_jobs:
+        if (spool_dir / "stop").exists():
+            break
+        job_path = _claim_next_job(spool_dir)
+        if job_path is None:
+            time.sleep(poll_interval)
+            continue
+        run_spool_job(worker, job_path)
+        num_jobs += 1
+    return num_jobs
+
+
+class _WorkerProcess:
+    """`serve` subprocess with its own spool directory and at most one job."""
+
+    def __init__(self, spool_dir: pathlib.Path, args: typing.List[str]):
+        self.spool_dir = spool_dir
+        self.args = args
+        self.process = None
+        self.frame = None
+        self.job_name = None
+        self.start()
+
+    def start(self):
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "blender_kitti", "--serve", str(self.spool_dir)]
+            + self.args
+        )
+
+    def submit(self, frame: typing.Tuple[str, str], job_name: str):
+        job = {"filenames": [frame[0]], "output": frame[1]}
+        tmp_path = self.spool_dir / (job_name + ".tmp")
+        YAML(typ="safe").dump(job, tmp_path)
+        # only complete job files are visible to the worker
+        tmp_path.rename(self.spool_dir / (job_name + JOB_SUFFIX))
+        self.frame = frame
+        self.job_name = job_name
+
+    def poll(self) -> typing.Union[bool, None]:
+        """Result of the current job: True, False (failed) or None (running)."""
+        job_path = self.spool_dir / (self.job_name + JOB_SUFFIX)
+        if job_path.with_name(job_path.name + ".done").exists():
+            return True
+        if job_path.with_name(job_path.name + ".failed").exists():
+            return False
+        if self.process.poll() is not None:
+            # the job may have been finished right before the exit
+            if job_path.with_name(job_path.name + ".done").exists():
+                return True
+            message = "Render process exited with code {}.".format(
+                self.process.returncode
+            )
+            logger.warning(message)
+            # the restarted process must not claim the job again, the frame is
+            # queued again by the driver
+            job_path.unlink(missing_ok=True)
+            job_path.with_name(job_path.name + ".running").unlink(missing_ok=True)
+            job_path.with_name(job_path.name + ".failed").write_text(message + "\n")
+            self.start()
+            return False
+        return None
+
+    def stop(self):
+        (self.spool_dir / "stop").touch()
+        self.process.wait()
+
+
+def render_sequence_parallel(
+    render_config: typing.Union[str, None],
+    filenames: typing.List[str],
+    output: str = "/tmp/blender_kitti_{frame:06d}.png",
+    num_workers: int = 2,
+    threads: typing.Union[int, None] = None,
+    device: str = "GPU",
+    max_retries: int = 1,
+    skip_existing: bool = True,
+    poll_interval: float = SPOOL_POLL_INTERVAL,
+) -> typing.List[str]:
+    """Render the frames of a sequence in `num_workers` processes.
+
+    Every process runs `serve` with its own bpy, keeps its scene alive between
+    frames and is fed one frame at a time. Failed frames are queued again, a
+    crashed process is restarted.
+
+    :param threads: Render threads per process (default: cores // num_workers)
+    :param max_retries: How often a failed frame is retried
+    :param skip_existing: Do not render frames whose output exists (resume)
+    :return: Outputs of frames that failed in all attempts
+    """
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // num_workers)
+    args = [
+        "--device",
+        device,
+        "--threads",
+        str(threads),
+        "--poll_interval",
+        str(poll_interval),
+    ]
+    if render_config is not None:
+        args += ["--render_config", render_config]
+
+    pending = collections.deque(_sequence_frames(filenames, output, skip_existing))
+    num_frames = len(pending)
+    attempts = collections.Counter()
+    failed = []
+    num_done = 0
+    num_submitted = 0
+
+    with tempfile.TemporaryDirectory(prefix="blender_kitti_spool_") as spool_root:
+        workers = [
+            _WorkerProcess(pathlib.Path(spool_root) / str(i), args)
+            for i in range(min(num_workers, num_frames))
+        ]
+        try:
+            while pending or any(w.frame is not None for w in workers):
+                for worker in workers:
+                    if worker.frame is not None:
+                        result = worker.poll()
+                        if result is None:
+                            continue
+                        frame, worker.frame = worker.frame, None
+                        if result:
+                            num_done += 1
+                            logger.info(
+                                "Rendered {}/{}: '{}'.".format(
+                                    num_done, num_frames, frame[1]
+                                )
+                            )
+                        elif attempts[frame] < max_retries:
+                            logger.warning("Retrying frame '{}'.".format(frame[0]))
+                            attempts[frame] += 1
+                            pending.append(frame)
+                        else:
+                            logger.error("Could not render '{}'.".format(frame[1]))
+                            failed.append(frame[1])
+
+                    if pending:
+                        worker.submit(pending.popleft(), "{:06d}".format(num_submitted))
+                        num_submitted += 1
+                time.sleep(poll_interval)
+        finally:
+            for worker in workers:
+                worker.stop()
+
+    return failed
+
+
+def render_scene(scene=None):
+    if scene is None:
+        bpy.ops.render.render(write_still=True)
+    else:
+        bpy.ops.render.render(write_still=True, scene=scene.name)
 
 
 @click.command(
@@ -93,11 +468,110 @@ def render_scene():
 @click.option("--python", required=False)
 @click.option("--background/--no-background", required=False)
 @click.option("--render_config", default=None)
-@click.argument("filenames", type=click.Path(exists=True), nargs=-1)
-def render(python, background, render_config: typing.Union[str, None], filenames):
+@click.option(
+    "--sequence/--no-sequence",
+    default=False,
+    help="Render every data file (or glob pattern match) as a separate frame.",
+)
+@click.option(
+    "--output",
+    default=None,
+    help="Output image path. In sequence mode formatted with {frame} and {stem}.",
+)
+@click.option(
+    "--serve",
+    "spool_dir",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Keep running and render the '*.yaml' job files put into this directory.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Sequence mode: number of render processes.",
+)
+@click.option(
+    "--threads",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Render threads per process. Default: all cores, split among --workers.",
+)
+@click.option("--device", type=click.Choice(RENDER_DEVICES), default="GPU")
+@click.option(
+    "--retries",
+    type=click.IntRange(min=0),
+    default=1,
+    help="Sequence mode with --workers > 1: retries of failed frames.",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=False,
+    help="Sequence mode: skip frames whose output already exists.",
+)
+@click.option(
+    "--poll_interval",
+    type=click.FloatRange(min=0.0),
+    default=SPOOL_POLL_INTERVAL,
+    help="Seconds between checks for new jobs (--serve) or finished frames.",
+)
+@click.argument("filenames", type=click.Path(), nargs=-1)
+def render(
+    python,
+    background,
+    render_config: typing.Union[str, None],
+    sequence: bool,
+    output: typing.Union[str, None],
+    spool_dir: typing.Union[str, None],
+    workers: int,
+    threads: typing.Union[int, None],
+    device: str,
+    retries: int,
+    resume: bool,
+    poll_interval: float,
+    filenames,
+):
     """ """
+    if spool_dir is not None:
+        serve(
+            spool_dir,
+            render_config,
+            poll_interval=poll_interval,
+            device=device,
+            threads=threads,
+        )
+        return
+
+    try:
+        filenames = expand_sequence_filenames(filenames)
+    except FileNotFoundError as e:
+        raise click.BadParameter(str(e), param_hint="FILENAMES")
+
+    if sequence:
+        if output is None:
+            output = "/tmp/blender_kitti_{frame:06d}.png"
+        if workers > 1:
+            failed = render_sequence_parallel(
+                render_config,
+                filenames,
+                output,
+                num_workers=workers,
+                threads=threads,
+                device=device,
+                max_retries=retries,
+                skip_existing=resume,
+                poll_interval=poll_interval,
+            )
+            if failed:
+                raise click.ClickException(
+                    "{} frames could not be rendered.".format(len(failed))
+                )
+        else:
+            render_sequence(render_config, filenames, output, resume, device, threads)
+        return
+
     scene, config = make_scene_from_data_files(render_config, filenames)
     add_cameras_default(scene)
 
-    scene.render.filepath = "/tmp/test.png"
+    scene.render.filepath = "/tmp/test.png" if output is None else output
     render_scene()
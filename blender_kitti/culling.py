@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Frustum and coarse occlusion culling of particles against the scene cameras."""
+
+import logging
+import typing
+
+import numpy as np
+
+from .lod import camera_matrix_world, render_size_px
+
+logger = logging.getLogger(__name__)
+
+# 'frustum' drops particles outside of all cameras, 'occlusion' additionally drops
+# particles hidden behind closer particles in every camera
+CULL_MODES = ("frustum", "occlusion")
+
+
+def scene_cameras(scene) -> list:
+    return [obj for obj in scene.objects if obj.type == "CAMERA"]
+
+
+def _sensor_size_px(scene, camera) -> float:
+    """Size of the image dimension the sensor is fitted to, in pixels."""
+    width, height = render_size_px(scene)
+    sensor_fit = camera.data.sensor_fit
+    if sensor_fit == "HORIZONTAL":
+        return width
+    if sensor_fit == "VERTICAL":
+        return height
+    return max(width, height)
+
+
+def _sensor_size_m(camera) -> float:
+    if camera.data.sensor_fit == "VERTICAL":
+        return camera.data.sensor_height
+    return camera.data.sensor_width
+
+
+def project_points(
+    scene, camera, points: np.ndarray
+) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Project world points into the image of `camera`.
+
+    :param points: [N, 3] world coordinates
+    :return: [N, 2] pixel coordinates (origin bottom left), [N] depth along the
+        viewing direction, [N] image scale in pixels per meter
+    """
+    matrix = camera_matrix_world(camera)
+    rotation = matrix[:3, :3] / np.linalg.norm(matrix[:3, :3], axis=0)
+    points_cam = (np.asarray(points, dtype=np.float64) - matrix[:3, 3]) @ rotation
+    # cameras look along their negative z-axis
+    depth = -points_cam[:, 2]
+
+    width, height = render_size_px(scene)
+    size_px = _sensor_size_px(scene, camera)
+    if camera.data.type == "ORTHO":
+        scale = np.full(len(depth), size_px / camera.data.ortho_scale)
+    else:
+        focal_length_px = camera.data.lens / _sensor_size_m(camera) * size_px
+        scale = focal_length_px / np.maximum(depth, camera.data.clip_start)
+
+    xy = points_cam[:, :2] * scale[:, None]
+    xy[:, 0] += 0.5 * width + camera.data.shift_x * size_px
+    xy[:, 1] += 0.5 * height + camera.data.shift_y * size_px
+    return xy, depth, scale
+
+
+def frustum_mask(
+    scene,
+    camera,
+    points: np.ndarray,
+    radius: typing.Union[float, np.ndarray] = 0.0,
+) -> np.ndarray:
+    """[N] True for the particles that intersect the view frustum of `camera`.
+
+    :param radius: Bounding sphere radius of every particle
+    """
+    xy, depth, scale = project_points(scene, camera, points)
+    return _frustum_mask(scene, camera, xy, depth, radius * scale, radius)
+
+
+def _frustum_mask(scene, camera, xy, depth, radius_px, radius) -> np.ndarray:
+    width, height = render_size_px(scene)
+    return (
+        (depth + radius >= camera.data.clip_start)
+        & (depth - radius <= camera.data.clip_end)
+        & (xy[:, 0] + radius_px >= 0.0)
+        & (xy[:, 0] - radius_px <= width)
+        & (xy[:, 1] + radius_px >= 0.0)
+        & (xy[:, 1] - radius_px <= height)
+    )
+
+
+def _dilate_max(grid: np.ndarray) -> np.ndarray:
+    """3x3 maximum filter, cells outside of the grid never occlude."""
+    padded = np.pad(grid, 1, constant_values=np.inf)
+    rows, cols = grid.shape
+    result = grid.copy()
+    for i in range(3):
+        for j in range(3):
+            np.maximum(result, padded[i : i + rows, j : j + cols], out=result)
+    return result
+
+
+def _occluded_mask(
+    scene, in_frustum, xy, depth, scale, radius, occluder_radius, cell_px
+) -> np.ndarray:
+    """Particles hidden behind particles that fully cover their depth buffer cell.
+
+    Conservative: only particles that fit into the 3x3 cells around their center
+    are tested and every cell stores the back of its nearest covering particle.
+    """
+    width, height = render_size_px(scene)
+    grid_shape = (int(np.ceil(height / cell_px)), int(np.ceil(width / cell_px)))
+    # points behind the camera also project into the image
+    in_image = (
+        in_frustum
+        & (xy[:, 0] >= 0.0)
+        & (xy[:, 0] < width)
+        & (xy[:, 1] >= 0.0)
+        & (xy[:, 1] < height)
+    )
+    cells = np.zeros(len(xy), dtype=np.int64)
+    cells[in_image] = np.ravel_multi_index(
+        (
+            (xy[in_image, 1] // cell_px).astype(np.int64),
+            (xy[in_image, 0] // cell_px).astype(np.int64),
+        ),
+        grid_shape,
+    )
+
+    occluder_radius = np.broadcast_to(occluder_radius, depth.shape)
+    # a disk centered anywhere in a cell covers the cell
+    is_occluder = in_image & (occluder_radius * scale >= np.sqrt(2.0) * cell_px)
+    cell_depth = np.full(grid_shape[0] * grid_shape[1], np.inf)
+    np.minimum.at(
+        cell_depth,
+        cells[is_occluder],
+        (depth + occluder_radius)[is_occluder],
+    )
+    cell_depth = _dilate_max(cell_depth.reshape(grid_shape)).reshape(-1)
+
+    is_occludee = in_image & (radius * scale <= 0.5 * cell_px)
+    return is_occludee & (depth - radius > cell_depth[cells])
+
+
+def visible_mask(
+    scene,
+    points: np.ndarray,
+    radius: typing.Union[float, np.ndarray] = 0.0,
+    mode: str = "frustum",
+    cameras: typing.Union[list, None] = None,
+    occluder_radius: typing.Union[float, np.ndarray, None] = None,
+    cell_px: float = 8.0,
+) -> np.ndarray:
+    """[N] True for the particles that may be visible in any camera.
+
+    :param radius: Bounding sphere radius of every particle
+    :param mode: One of CULL_MODES
+    :param cameras: Camera objects, default: all cameras of the scene. Without any
+        camera nothing is culled.
+    :param occluder_radius: 'occlusion' mode only, radius of a sphere inside every
+        particle (default: radius)
+    :param cell_px: 'occlusion' mode only, depth buffer cell size in pixels
+    """
+    if mode not in CULL_MODES:
+        raise ValueError("Unknown cull mode '{}'.".format(mode))
+    if cameras is None:
+        cameras = scene_cameras(scene)
+    if not cameras:
+        logger.info("No cameras in scene '{}', nothing is culled.".format(scene.name))
+        return np.ones(len(points), dtype=bool)
+    if occluder_radius is None:
+        occluder_radius = radius
+    radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(points),))
+
+    visible = np.zeros(len(points), dtype=bool)
+    for camera in cameras:
+        xy, depth, scale = project_points(scene, camera, points)
+        radius_px = radius * scale
+        in_frustum = _frustum_mask(scene, camera, xy, depth, radius_px, radius)
+        if mode == "occlusion":
+            in_frustum &= ~_occluded_mask(
+                scene,
+                in_frustum,
+                xy,
+                depth,
+                scale,
+                radius,
+                occluder_radius,
+                cell_px,
+            )
+        visible |= in_frustum
+
+    logger.info(
+        "Culled {} of {} particles ({}).".format(
+            len(visible) - np.count_nonzero(visible), len(visible), mode
+        )
+    )
+    return visible
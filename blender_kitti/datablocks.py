@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Tracking and bulk removal of the Blender datablocks created by blender_kitti."""
+
+import typing
+
+import bpy
+
+# bpy.data collections of all datablock types the builders of this package create
+DATABLOCK_COLLECTIONS = (
+    "objects",
+    "meshes",
+    "materials",
+    "images",
+    "node_groups",
+    "worlds",
+    "cameras",
+    "lights",
+    "collections",
+    "scenes",
+)
+# scenes not shown in a window have no users, never treat them as orphans
+ORPHAN_COLLECTIONS = tuple(k for k in DATABLOCK_COLLECTIONS if k != "scenes")
+
+
+def _snapshot(collections: typing.Iterable[str]) -> typing.Dict[str, set]:
+    return {k: set(getattr(bpy.data, k)) for k in collections}
+
+
+def is_datablock_alive(datablock) -> bool:
+    try:
+        datablock.name
+    except ReferenceError:
+        return False
+    return True
+
+
+# datablocks of module level caches (prototype meshes, shared materials, ...),
+# keyed by pointer, registries never record or remove them
+_shared_datablocks = {}
+
+
+def mark_shared(*datablocks):
+    """Exclude cached datablocks that outlive a single job from all registries."""
+    for pointer, datablock in list(_shared_datablocks.items()):
+        if not is_datablock_alive(datablock):
+            del _shared_datablocks[pointer]
+    for datablock in datablocks:
+        _shared_datablocks[datablock.as_pointer()] = datablock
+
+
+def is_shared_datablock(datablock) -> bool:
+    shared = _shared_datablocks.get(datablock.as_pointer())
+    # a removed shared datablock can leave its pointer to a new one
+    return shared is not None and is_datablock_alive(shared) and shared == datablock
+
+
+class DatablockRegistry:
+    """Records the datablocks created while the registry is entered.
+
+    Every datablock that appears in one of `collections` between `__enter__` and
+    `__exit__` is recorded (scopes can be entered repeatedly and nested). All
+    recorded datablocks are removed at once with `remove_all`, without any bpy.ops
+    calls and without leaving orphan meshes, images or materials behind. Shared
+    datablocks (see `mark_shared`) are never recorded, they are reused by later
+    jobs.
+
+    Usage:
+        registry = DatablockRegistry()
+        with registry:
+            add_point_cloud(scene, points=points)
+        ...
+        registry.remove_all()
+    """
+
+    def __init__(self, collections: typing.Iterable[str] = DATABLOCK_COLLECTIONS):
+        self.collections = tuple(collections)
+        self._snapshots = []
+        self._datablocks = {}
+
+    def __enter__(self):
+        self._snapshots.append(_snapshot(self.collections))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        snapshot = self._snapshots.pop()
+        for k in self.collections:
+            self.track(*(d for d in getattr(bpy.data, k) if d not in snapshot[k]))
+        return False
+
+    def track(self, *datablocks):
+        """Record datablocks that were created outside of a registry scope."""
+        for datablock in datablocks:
+            if not is_shared_datablock(datablock):
+                # dict as insertion ordered set
+                self._datablocks[datablock] = None
+
+    def __iter__(self):
+        # datablocks can be marked shared after they were recorded
+        return (
+            d
+            for d in self._datablocks
+            if is_datablock_alive(d) and not is_shared_datablock(d)
+        )
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def remove_all(self):
+        """Remove all recorded datablocks that still exist."""
+        datablocks = list(self)
+        self._datablocks.clear()
+        if datablocks:
+            bpy.data.batch_remove(datablocks)
+        return len(datablocks)
+
+
+def remove_orphan_data(collections: typing.Iterable[str] = ORPHAN_COLLECTIONS):
+    """Remove all datablocks without users (and without fake user).
+
+    Repeated until nothing is left, removing e.g. a mesh can orphan its materials.
+    """
+    num_removed = 0
+    while True:
+        orphans = [
+            d
+            for k in collections
+            for d in getattr(bpy.data, k)
+            if d.users == 0 and not d.use_fake_user
+        ]
+        if not orphans:
+            return num_removed
+        bpy.data.batch_remove(orphans)
+        num_removed += len(orphans)
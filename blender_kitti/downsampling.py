@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Voxel-grid downsampling of point clouds, vectorized with NumPy."""
+
+import logging
+import typing
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 'mean' averages the colors of a voxel, 'majority' keeps its most frequent color
+# (e.g. semantic label colors, which must not be mixed)
+COLOR_REDUCTIONS = ("mean", "majority")
+
+
+def _unique_rows(rows: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Unique rows of a [N, C] array and the index of every row into them.
+
+    Integer rows are packed into a single int64 key (much faster than axis=0).
+    """
+    if np.issubdtype(rows.dtype, np.integer):
+        offsets = rows.min(axis=0)
+        shifted = rows.astype(np.int64) - offsets
+        shape = shifted.max(axis=0) + 1
+        if np.prod(shape.astype(np.float64)) < 2.0**62:
+            keys = np.ravel_multi_index(shifted.T, shape)
+            _, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            return rows[index], inverse.reshape(-1)
+    unique_rows, inverse = np.unique(rows, axis=0, return_inverse=True)
+    return unique_rows, inverse.reshape(-1)
+
+
+def voxel_grid_indices(
+    points: np.ndarray, voxel_size: float
+) -> typing.Tuple[np.ndarray, int]:
+    """Voxel of every point.
+
+    :param points: [N, 3] coordinates
+    :return: [N] voxel index per point in 0..M-1, M (number of occupied voxels)
+    """
+    points = np.asarray(points)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    cells = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+    unique_cells, inverse = _unique_rows(cells)
+    return inverse, len(unique_cells)
+
+
+def _mean_per_voxel(values: np.ndarray, inverse: np.ndarray, counts: np.ndarray):
+    values = np.asarray(values)
+    sums = np.stack(
+        [
+            np.bincount(inverse, weights=values[:, k], minlength=len(counts))
+            for k in range(values.shape[1])
+        ],
+        axis=-1,
+    )
+    means = sums / counts[:, None]
+    if np.issubdtype(values.dtype, np.integer):
+        means = np.rint(means)
+    return means.astype(values.dtype)
+
+
+def _majority_per_voxel(values: np.ndarray, inverse: np.ndarray, num_voxels: int):
+    """Most frequent value (row) per voxel, ties go to the smallest value."""
+    values = np.asarray(values)
+    unique_rows, value_ids = _unique_rows(values.reshape((len(values), -1)))
+
+    pairs, pair_counts = np.unique(
+        inverse * len(unique_rows) + value_ids, return_counts=True
+    )
+    pair_voxels = pairs // len(unique_rows)
+    # per voxel: the pair with the highest count comes first
+    order = np.lexsort((-pair_counts, pair_voxels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pair_voxels[order][1:] != pair_voxels[order][:-1]
+    majority = np.empty(num_voxels, dtype=np.int64)
+    majority[pair_voxels[order][first]] = (pairs % len(unique_rows))[order][first]
+    return unique_rows[majority].reshape((num_voxels,) + values.shape[1:])
+
+
+def reduce_per_voxel(
+    values: np.ndarray,
+    inverse: np.ndarray,
+    num_voxels: int,
+    reduction: str = "mean",
+) -> np.ndarray:
+    """Combine the per-point `values` of every voxel (see `voxel_grid_indices`).
+
+    :param values: [N] or [N, C] values, e.g. colors or labels
+    :param reduction: One of COLOR_REDUCTIONS
+    :return: [M] or [M, C] values of the same dtype
+    """
+    if reduction not in COLOR_REDUCTIONS:
+        raise ValueError("Unknown color reduction '{}'.".format(reduction))
+    if reduction == "majority":
+        return _majority_per_voxel(values, inverse, num_voxels)
+
+    counts = np.bincount(inverse, minlength=num_voxels)
+    values = np.asarray(values)
+    if values.ndim == 1:
+        return _mean_per_voxel(values[:, None], inverse, counts)[:, 0]
+    return _mean_per_voxel(values, inverse, counts)
+
+
+def voxel_size_for_count(
+    points: np.ndarray,
+    max_points: int,
+    tolerance: float = 0.05,
+    max_iterations: int = 20,
+) -> float:
+    """Voxel size that reduces `points` to at most (close to) `max_points` voxels.
+
+    Bisection on a log scale, every step counts the occupied voxels once.
+
+    :param tolerance: Accept sizes with at least (1 - tolerance) * max_points voxels
+    """
+    if max_points < 1:
+        raise ValueError("max_points must be positive, got {}.".format(max_points))
+    points = np.asarray(points)
+    if len(points) <= max_points:
+        return 0.0
+    extent = float((points.max(axis=0) - points.min(axis=0)).max())
+    if extent == 0.0:
+        return 0.0
+
+    # a single voxel holds all points
+    upper = extent * 1.01
+    lower = upper / max(len(points), 2)
+    for _ in range(max_iterations):
+        voxel_size = np.sqrt(lower * upper)
+        num_voxels = voxel_grid_indices(points, voxel_size)[1]
+        if num_voxels > max_points:
+            lower = voxel_size
+        elif num_voxels >= (1.0 - tolerance) * max_points:
+            return float(voxel_size)
+        else:
+            upper = voxel_size
+    return float(upper)
+
+
+def downsample_point_cloud(
+    points: np.ndarray,
+    colors=None,
+    *,
+    voxel_size: typing.Union[float, None] = None,
+    max_points: typing.Union[int, None] = None,
+    color_reduction: str = "mean",
+):
+    """Replace the points of every occupied voxel by their centroid.
+
+    :param points: [N, 3] coordinates
+    :param colors: None, [N, C] colors or a list of them, reduced per voxel with
+        `color_reduction`
+    :param voxel_size: Voxel edge length
+    :param max_points: Target point count, chooses the voxel size (the larger one
+        if both are given)
+    :param color_reduction: One of COLOR_REDUCTIONS
+    :return: [M, 3] points (dtype of points), colors like the input
+    """
+    if color_reduction not in COLOR_REDUCTIONS:
+        raise ValueError("Unknown color reduction '{}'.".format(color_reduction))
+    if voxel_size is None and max_points is None:
+        raise ValueError("Need voxel_size or max_points to downsample.")
+
+    voxel_size = 0.0 if voxel_size is None else float(voxel_size)
+    if max_points is not None:
+        voxel_size = max(voxel_size, voxel_size_for_count(points, int(max_points)))
+    if voxel_size <= 0.0 or len(points) == 0:
+        return points, colors
+
+    inverse, num_voxels = voxel_grid_indices(points, voxel_size)
+    counts = np.bincount(inverse, minlength=num_voxels)
+    centroids = _mean_per_voxel(
+        np.asarray(points, dtype=np.float64), inverse, counts
+    ).astype(points.dtype)
+
+    def reduce(c):
+        return reduce_per_voxel(c, inverse, num_voxels, color_reduction)
+
+    if isinstance(colors, np.ndarray):
+        colors = reduce(colors)
+    elif colors is not None:
+        colors = [reduce(c) for c in colors]
+
+    logger.info(
+        "Downsampled {} to {} points (voxel size {:.4f}).".format(
+            len(points), num_voxels, voxel_size
+        )
+    )
+    return centroids, colors
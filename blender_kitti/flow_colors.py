@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Vectorized colors of flow vectors: direction to hue, magnitude to saturation."""
+
+import typing
+
+import numpy as np
+
+# 'hsv' maps the azimuth to the hue, 'middlebury' uses the color wheel of the
+# Middlebury optical flow benchmark (Baker et al., 2011)
+FLOW_COLOR_WHEELS = ("hsv", "middlebury")
+
+# number of colors between red, yellow, green, cyan, blue, magenta and red
+MIDDLEBURY_SEGMENTS = (15, 6, 4, 11, 13, 6)
+
+
+def hsv_to_rgb(hsv: np.ndarray) -> np.ndarray:
+    """Vectorized `colorsys.hsv_to_rgb` of [..., 3] arrays with values in [0, 1]."""
+    hsv = np.asarray(hsv, dtype=np.float64)
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(np.int64) % 6
+
+    # (r, g, b) of every sector
+    candidates = np.stack(
+        [
+            np.stack([v, t, p], axis=-1),
+            np.stack([q, v, p], axis=-1),
+            np.stack([p, v, t], axis=-1),
+            np.stack([p, q, v], axis=-1),
+            np.stack([t, p, v], axis=-1),
+            np.stack([v, p, q], axis=-1),
+        ],
+        axis=-2,
+    )
+    return np.take_along_axis(candidates, i[..., None, None], axis=-2)[..., 0, :]
+
+
+def middlebury_color_wheel() -> np.ndarray:
+    """[55, 3] RGB colors of the Middlebury color wheel in [0, 1]."""
+    colors = []
+    for k, num in enumerate(MIDDLEBURY_SEGMENTS):
+        ramp = np.arange(num) / num
+        rising = k % 2 == 0
+        # starts at red, every segment ramps one channel up or the previous down
+        segment = np.zeros((num, 3))
+        channel = (k // 2) % 3
+        if rising:
+            segment[:, channel] = 1.0
+            segment[:, (channel + 1) % 3] = ramp
+        else:
+            segment[:, channel] = 1.0 - ramp
+            segment[:, (channel + 1) % 3] = 1.0
+        colors.append(segment)
+    return np.concatenate(colors)
+
+
+def _middlebury_colors(angle: np.ndarray, radius: np.ndarray) -> np.ndarray:
+    wheel = middlebury_color_wheel()
+    # angle in [-pi, pi] to a fractional wheel index
+    position = (angle / np.pi + 1.0) / 2.0 * (len(wheel) - 1)
+    k0 = np.floor(position).astype(np.int64)
+    k1 = (k0 + 1) % len(wheel)
+    f = (position - k0)[..., None]
+    colors = (1.0 - f) * wheel[k0] + f * wheel[k1]
+
+    radius = radius[..., None]
+    # saturation increases with the radius, out of range flow is darkened
+    return np.where(radius <= 1.0, 1.0 - radius * (1.0 - colors), 0.75 * colors)
+
+
+def flow_colors(
+    flow: np.ndarray,
+    *,
+    color_wheel: str = "hsv",
+    max_magnitude: typing.Union[float, None] = None,
+    use_magnitude: bool = True,
+    alpha: float = 1.0,
+) -> np.ndarray:
+    """Colors of flow vectors by direction (azimuth in the xy-plane) and magnitude.
+
+    :param flow: [N, 2] or [N, 3] flow vectors
+    :param color_wheel: One of FLOW_COLOR_WHEELS
+    :param max_magnitude: Magnitude of fully saturated colors, default: largest
+        magnitude of `flow`
+    :param use_magnitude: False colors only by direction (full saturation)
+    :return: [N, 4] float32 RGBA colors, e.g. for `add_flow_mesh`
+    """
+    if color_wheel not in FLOW_COLOR_WHEELS:
+        raise ValueError("Unknown flow color wheel '{}'.".format(color_wheel))
+    flow = np.asarray(flow, dtype=np.float64)
+
+    if use_magnitude:
+        magnitude = np.linalg.norm(flow, axis=-1)
+        if max_magnitude is None:
+            max_magnitude = magnitude.max(initial=0.0)
+        radius = magnitude / max(max_magnitude, np.finfo(np.float64).tiny)
+    else:
+        radius = np.ones(len(flow))
+
+    colors = np.empty((len(flow), 4), dtype=np.float32)
+    if color_wheel == "hsv":
+        azimuth = np.arctan2(flow[:, 1], flow[:, 0])
+        hsv = np.empty((len(flow), 3))
+        hsv[:, 0] = np.fmod(azimuth + np.pi, 2.0 * np.pi) / (2.0 * np.pi)
+        hsv[:, 1] = np.minimum(radius, 1.0)
+        hsv[:, 2] = 1.0
+        colors[:, :3] = hsv_to_rgb(hsv)
+    else:
+        # Middlebury convention: the wheel angle of flow (u, v) is atan2(-v, -u)
+        colors[:, :3] = _middlebury_colors(np.arctan2(-flow[:, 1], -flow[:, 0]), radius)
+    colors[:, 3] = alpha
+    return colors
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Furthest point sampling accelerated by a grid of point buckets.
+
+Every sample only updates the distances of points in buckets that can get closer
+to it, and the next sample is searched in the bucket with the largest distance.
+"""
+
+import logging
+import typing
+
+import numpy as np
+
+from .downsampling import voxel_grid_indices, voxel_size_for_count
+
+logger = logging.getLogger(__name__)
+
+# max. number of points whose distances are updated at once
+CHUNK_SIZE = 1 << 16
+
+
+class _Buckets:
+    """Points sorted by grid cell, with the bounding box of every cell."""
+
+    def __init__(self, points: np.ndarray, cell_points: int):
+        num_cells = max(1, len(points) // cell_points)
+        voxel_size = voxel_size_for_count(points, num_cells, tolerance=0.5)
+        if voxel_size > 0.0:
+            inverse, num_cells = voxel_grid_indices(points, voxel_size)
+        else:
+            inverse, num_cells = np.zeros(len(points), dtype=np.int64), 1
+
+        self.order = np.argsort(inverse, kind="stable")
+        self.points = np.ascontiguousarray(points[self.order], dtype=np.float32)
+        self.counts = np.bincount(inverse, minlength=num_cells)
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.lower = np.minimum.reduceat(self.points, self.starts, axis=0)
+        self.upper = np.maximum.reduceat(self.points, self.starts, axis=0)
+
+    def point_indices(self, cells: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Sorted indices of all points in `cells` and the offset of every cell."""
+        counts = self.counts[cells]
+        offsets = np.cumsum(counts) - counts
+        indices = np.arange(counts.sum()) - np.repeat(
+            offsets - self.starts[cells], counts
+        )
+        return indices, offsets
+
+    def box_distances_sq(self, point: np.ndarray) -> np.ndarray:
+        delta = np.maximum(self.lower - point, point - self.upper)
+        np.maximum(delta, 0.0, out=delta)
+        return np.einsum("ij,ij->i", delta, delta)
+
+
+def _squared_distances(points: np.ndarray, point: np.ndarray) -> np.ndarray:
+    delta = points - point
+    return np.einsum("ij,ij->i", delta, delta)
+
+
+def _furthest_point_sampling(
+    points: np.ndarray,
+    num_samples: typing.Union[int, None],
+    dist_thresh: float,
+    start_index: typing.Union[int, None],
+    seed: typing.Union[int, None],
+    cell_points: int,
+) -> np.ndarray:
+    points = np.asarray(points)
+    assert points.ndim == 2 and points.shape[1] == 3
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if num_samples is None:
+        num_samples = len(points)
+    num_samples = min(int(num_samples), len(points))
+    if start_index is None:
+        start_index = int(np.random.default_rng(seed).integers(len(points)))
+
+    buckets = _Buckets(points, cell_points)
+    # min. squared distance of every (sorted) point to the samples
+    distances = np.full(len(points), np.inf, dtype=np.float32)
+    cell_max = np.full(len(buckets.counts), np.inf, dtype=np.float32)
+    thresh_sq = np.float32(dist_thresh) ** 2
+
+    samples = np.empty(num_samples, dtype=np.int64)
+    sample = int(np.flatnonzero(buckets.order == start_index)[0])
+    for k in range(num_samples):
+        samples[k] = sample
+        point = buckets.points[sample]
+
+        # only cells that may contain points closer to the new sample
+        cells = np.flatnonzero(buckets.box_distances_sq(point) < cell_max)
+        indices, offsets = buckets.point_indices(cells)
+        for begin in range(0, len(indices), CHUNK_SIZE):
+            chunk = indices[begin : begin + CHUNK_SIZE]
+            distances[chunk] = np.minimum(
+                distances[chunk], _squared_distances(buckets.points[chunk], point)
+            )
+        cell_max[cells] = np.maximum.reduceat(distances[indices], offsets)
+
+        cell = int(np.argmax(cell_max))
+        if cell_max[cell] < thresh_sq or cell_max[cell] == 0.0:
+            samples = samples[: k + 1]
+            break
+        start = buckets.starts[cell]
+        sample = int(start + np.argmax(distances[start : start + buckets.counts[cell]]))
+
+    return buckets.order[samples]
+
+
+def furthest_point_sampling(
+    points: np.ndarray,
+    num_samples: int,
+    *,
+    start_index: typing.Union[int, None] = None,
+    seed: typing.Union[int, None] = 0,
+    cell_points: int = 64,
+) -> np.ndarray:
+    """Indices of `num_samples` points that iteratively maximize the distance to
+    all previous samples.
+
+    :param points: [N, 3] coordinates
+    :param start_index: First sample, default: random point drawn with `seed`
+    :param seed: Seed of the first sample, None for a non-deterministic start
+    :param cell_points: Average number of points per grid bucket
+    :return: [min(N, num_samples)] indices into points, in sampling order (fewer if
+        all remaining points coincide with samples)
+    """
+    return _furthest_point_sampling(
+        points, num_samples, 0.0, start_index, seed, cell_points
+    )
+
+
+def furthest_point_sampling_thresh(
+    points: np.ndarray,
+    dist_thresh: float,
+    *,
+    max_samples: typing.Union[int, None] = None,
+    start_index: typing.Union[int, None] = None,
+    seed: typing.Union[int, None] = 0,
+    cell_points: int = 64,
+) -> np.ndarray:
+    """Furthest point sampling until all points are closer than `dist_thresh` to
+    a sample.
+
+    :param dist_thresh: Euclidean distance
+    :param max_samples: Stop after this many samples
+    :return: [K] indices into points, in sampling order
+    """
+    indices = _furthest_point_sampling(
+        points, max_samples, dist_thresh, start_index, seed, cell_points
+    )
+    logger.info(
+        "Sampled {} of {} points with distance threshold {}.".format(
+            len(indices), len(points), dist_thresh
+        )
+    )
+    return indices
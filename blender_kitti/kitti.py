@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Memory-mapped readers of the KITTI / SemanticKITTI binary files.
+
+Scans and labels are returned as np.memmap views, slicing them (e.g. the xyz
+columns of a scan) does not read or copy the file.
+"""
+
+import logging
+import pathlib
+import typing
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# x, y, z, reflectance
+VELODYNE_SCAN_COLUMNS = 4
+# SemanticKITTI voxel grids
+VOXEL_GRID_SHAPE = (256, 256, 32)
+# file suffix of every voxel grid and whether it is bit packed
+VOXEL_FILES = {
+    "bin": True,
+    "invalid": True,
+    "label": False,
+    "occluded": True,
+}
+
+
+def _memmap(filepath, dtype, shape, mmap_mode: str) -> np.ndarray:
+    filepath = pathlib.Path(filepath)
+    if not filepath.is_file():
+        raise FileNotFoundError("Cannot find KITTI file '{}'.".format(filepath))
+    dtype = np.dtype(dtype)
+    if filepath.stat().st_size == 0:
+        # empty files cannot be mapped
+        return np.zeros((0,) + shape[1:], dtype=dtype)
+    return np.memmap(filepath, dtype=dtype, mode=mmap_mode).reshape(shape)
+
+
+def read_velodyne_scan(filepath, mmap_mode: str = "r") -> np.ndarray:
+    """[N, 4] float32 scan (x, y, z, reflectance), see `scan_xyz`."""
+    return _memmap(filepath, "<f4", (-1, VELODYNE_SCAN_COLUMNS), mmap_mode)
+
+
+def scan_xyz(scan: np.ndarray) -> np.ndarray:
+    """[N, 3] view of the coordinates of a scan."""
+    return scan[:, :3]
+
+
+def scan_reflectance(scan: np.ndarray) -> np.ndarray:
+    """[N] view of the reflectance of a scan."""
+    return scan[:, 3]
+
+
+def read_semantic_label(filepath, mmap_mode: str = "r") -> np.ndarray:
+    """[N] uint32 point labels, see `split_semantic_label`."""
+    return _memmap(filepath, "<u4", (-1,), mmap_mode)
+
+
+def split_semantic_label(label: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Views of the semantic class (lower 16 bits) and the instance id (upper 16
+    bits) of uint32 labels.
+
+    :return: [N] uint16 semantic labels, [N] uint16 instance ids
+    """
+    halves = label.view("<u2").reshape((-1, 2))
+    return halves[:, 0], halves[:, 1]
+
+
+def read_voxel_grid(
+    filepath,
+    packed: bool,
+    shape: typing.Tuple[int, ...] = VOXEL_GRID_SHAPE,
+    mmap_mode: str = "r",
+) -> np.ndarray:
+    """SemanticKITTI voxel grid.
+
+    :param packed: Bit packed occupancy (.bin, .invalid, .occluded), unpacked into
+        a bool grid (this reads the file). Otherwise a uint16 label grid (.label),
+        returned as memmap.
+    """
+    if not packed:
+        return _memmap(filepath, "<u2", shape, mmap_mode)
+    bits = _memmap(filepath, np.uint8, (-1,), mmap_mode)
+    return np.unpackbits(bits).view(bool).reshape(shape)
+
+
+def read_voxel_grids(
+    filepath_stem, shape: typing.Tuple[int, ...] = VOXEL_GRID_SHAPE
+) -> typing.Dict[str, np.ndarray]:
+    """All voxel grids of a sample, keys are the file suffixes of VOXEL_FILES.
+
+    :param filepath_stem: Path of the grid files without suffix
+    """
+    filepath_stem = pathlib.Path(filepath_stem)
+    return {
+        k: read_voxel_grid(
+            filepath_stem.parent / "{}.{}".format(filepath_stem.name, k), packed, shape
+        )
+        for k, packed in VOXEL_FILES.items()
+    }
+
+
+class SemanticKittiSequence:
+    """Lazy access to the frames of a (Semantic)KITTI odometry sequence.
+
+    Expects the directory layout of the dataset, e.g. 'sequences/08' containing
+    'velodyne/000000.bin' and optionally 'labels/000000.label'. Nothing is read
+    before a frame is accessed and frames are memory-mapped.
+
+    Usage:
+        for frame in SemanticKittiSequence("sequences/08"):
+            points = scan_xyz(frame["scan"])
+    """
+
+    def __init__(self, sequence_dir, mmap_mode: str = "r"):
+        self.sequence_dir = pathlib.Path(sequence_dir)
+        self.mmap_mode = mmap_mode
+        self.scan_files = sorted((self.sequence_dir / "velodyne").glob("*.bin"))
+        if not self.scan_files:
+            raise FileNotFoundError(
+                "Cannot find velodyne scans in '{}'.".format(self.sequence_dir)
+            )
+        logger.info(
+            "Found {} frames in '{}'.".format(len(self.scan_files), self.sequence_dir)
+        )
+
+    def __len__(self):
+        return len(self.scan_files)
+
+    def label_file(self, index: int) -> pathlib.Path:
+        return self.sequence_dir / "labels" / (self.scan_files[index].stem + ".label")
+
+    def __getitem__(self, index: int) -> typing.Dict[str, np.ndarray]:
+        """Frame with 'scan' and, if the label file exists, 'label'."""
+        frame = {"scan": read_velodyne_scan(self.scan_files[index], self.mmap_mode)}
+        label_file = self.label_file(index)
+        if label_file.is_file():
+            frame["label"] = read_semantic_label(label_file, self.mmap_mode)
+        return frame
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
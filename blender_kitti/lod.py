@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Level of detail of particle prototypes from their size on screen."""
+
+import logging
+import typing
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Max. distance of an icosphere surface to its sphere relative to the radius, for
+# 1 (icosahedron), 2, 3, ... subdivisions (measured at the face centers).
+ICOSPHERE_RELATIVE_ERRORS = (0.2054, 0.0658, 0.0178, 0.0045, 0.0011)
+MAX_ICOSPHERE_SUBDIVISIONS = len(ICOSPHERE_RELATIVE_ERRORS)
+
+
+def camera_matrix_world(camera) -> np.ndarray:
+    """4x4 world matrix, also of cameras that were not evaluated yet."""
+    # matrix_world is only updated by a depsgraph evaluation
+    matrix = camera.matrix_world if camera.parent is not None else camera.matrix_basis
+    return np.array(matrix, dtype=np.float64)
+
+
+def render_size_px(scene) -> typing.Tuple[float, float]:
+    factor = scene.render.resolution_percentage / 100.0
+    return scene.render.resolution_x * factor, scene.render.resolution_y * factor
+
+
+def pixels_per_meter(scene, camera, points: np.ndarray) -> np.ndarray:
+    """Approximate image scale at every point in pixels per meter.
+
+    Uses the distance to the camera center (perspective) or the constant scale
+    (orthographic). The sensor is fitted to the larger image dimension ('AUTO').
+
+    :param points: [N, 3] world coordinates
+    :return: [N] pixels per meter
+    """
+    size_px = max(render_size_px(scene))
+    if camera.data.type == "ORTHO":
+        return np.full(len(points), size_px / camera.data.ortho_scale)
+
+    focal_length_px = camera.data.lens / camera.data.sensor_width * size_px
+    center = camera_matrix_world(camera)[:3, 3]
+    distances = np.linalg.norm(np.asarray(points, dtype=np.float64) - center, axis=-1)
+    return focal_length_px / np.maximum(distances, 1e-6)
+
+
+def icosphere_subdivisions(
+    radius_px: typing.Union[float, np.ndarray],
+    tolerance_px: float = 0.5,
+    max_subdivisions: int = MAX_ICOSPHERE_SUBDIVISIONS,
+) -> np.ndarray:
+    """Smallest number of icosphere subdivisions with an error below tolerance.
+
+    :param radius_px: Sphere radius on screen in pixels
+    :param tolerance_px: Max. deviation of the icosphere from the sphere in pixels
+    :return: Subdivisions (>= 1) per radius
+    """
+    radius_px = np.maximum(np.asarray(radius_px, dtype=np.float64), 1e-9)
+    max_relative_error = tolerance_px / radius_px
+    # errors are decreasing, count the levels that are still too coarse
+    num_too_coarse = np.searchsorted(
+        -np.asarray(ICOSPHERE_RELATIVE_ERRORS), -max_relative_error, side="left"
+    )
+    return np.clip(num_too_coarse + 1, 1, max_subdivisions).astype(np.int64)
+
+
+def auto_icosphere_subdivisions(
+    scene,
+    points: np.ndarray,
+    radius: float,
+    tolerance_px: float = 0.5,
+    max_subdivisions: int = 3,
+) -> int:
+    """Subdivisions of a single prototype for all points, seen by the scene camera.
+
+    Chosen for the point closest to the camera, or `max_subdivisions` if the
+    scene has no camera yet.
+    """
+    if scene is None or scene.camera is None or len(points) == 0:
+        logger.info("No scene camera, using {} subdivisions.".format(max_subdivisions))
+        return max_subdivisions
+
+    radius_px = radius * pixels_per_meter(scene, scene.camera, points).max()
+    return int(icosphere_subdivisions(radius_px, tolerance_px, max_subdivisions))
+
+
+def lod_levels(
+    scene,
+    camera,
+    points: np.ndarray,
+    radius: float,
+    tolerance_px: float = 0.5,
+    max_subdivisions: int = 3,
+    billboard_px: float = 1.0,
+) -> np.ndarray:
+    """Level of detail of every particle seen by `camera`.
+
+    :param billboard_px: Particles with a smaller radius on screen use level 0
+    :return: [N] level per point, 0 for a camera facing billboard, otherwise the
+        icosphere subdivisions
+    """
+    radius_px = radius * pixels_per_meter(scene, camera, points)
+    levels = icosphere_subdivisions(radius_px, tolerance_px, max_subdivisions)
+    levels[radius_px < billboard_px] = 0
+    return levels
+
+
+def billboard_corners(camera, radius: float) -> np.ndarray:
+    """[4, 3] corners of a square parallel to the image plane of `camera`.
+
+    The square has the area of a disk with `radius` and faces the camera.
+    """
+    rotation = camera_matrix_world(camera)[:3, :3]
+    rotation = rotation / np.linalg.norm(rotation, axis=0)
+    half_size = 0.5 * np.sqrt(np.pi) * radius
+    # counter-clockwise around the camera z-axis, which points to the camera
+    corners_cam = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64)
+    return half_size * corners_cam @ rotation[:, :2].T
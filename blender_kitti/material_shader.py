@@ -6,6 +6,7 @@ import typing
 import bpy
 
 from .colormap_turbo import turbo_colormap_data
+from .datablocks import is_datablock_alive, mark_shared
 
 
 class NodeRGBColorSelect:
@@ -113,14 +114,24 @@ class NodeOutput:
         return self.node_rgb_color_select.color_input
 
 
+# Blender limits color ramps to 32 elements
+MAX_COLOR_RAMP_ELEMENTS = 32
+
+
 def make_color_ramp_node(nodes, colormap):
     node = nodes.new(type="ShaderNodeValToRGB")
     color_ramp_elements = node.color_ramp.elements
 
-    n_stops = len(colormap)
-    for i, color in enumerate(colormap):
+    # evenly subsample long colormaps
+    n_stops = min(len(colormap), MAX_COLOR_RAMP_ELEMENTS)
+    indices = [round(i * (len(colormap) - 1) / (n_stops - 1)) for i in range(n_stops)]
+
+    # the new ramp already has elements at 0.0 and 1.0
+    color_ramp_elements[0].color = list(colormap[indices[0]]) + [1.0]
+    color_ramp_elements[-1].color = list(colormap[indices[-1]]) + [1.0]
+    for i, index in enumerate(indices[1:-1], start=1):
         element = color_ramp_elements.new(position=i / (n_stops - 1))
-        element.color = color + [1.0]
+        element.color = list(colormap[index]) + [1.0]
 
     return node
 
@@ -254,6 +265,14 @@ def make_nodes_simple_material(material, base_color):
     return default_output_node
 
 
+def uv_divide_node_names(color_image) -> typing.Tuple[str, str]:
+    """Names of the nodes dividing by the width and height of `color_image`."""
+    return (
+        "{}_divide_x".format(color_image.name),
+        "{}_divide_y".format(color_image.name),
+    )
+
+
 def _make_nodes_uv_mapped_material(node_tree, color_image):
     nodes = node_tree.nodes
     # create uv input node
@@ -281,6 +300,8 @@ def _make_nodes_uv_mapped_material(node_tree, color_image):
     node_div_y.inputs[1].default_value = float(color_image.size[1])
     node_div_y.operation = "DIVIDE"
     node_div_y.location = 520, -200
+    # found by name when the image is resized
+    node_div_x.name, node_div_y.name = uv_divide_node_names(color_image)
 
     node_comb = nodes.new(type="ShaderNodeCombineXYZ")
     node_comb.inputs[2].default_value = 0.0
@@ -324,6 +345,40 @@ def add_nodes_to_material(material, color_image):
     return _make_nodes_uv_mapped_material(material.node_tree, color_image)
 
 
+def _make_nodes_attribute_material(
+    node_tree, attribute_name: str, attribute_type: str = "INSTANCER"
+):
+    nodes = node_tree.nodes
+    # by default per-instance color attribute, propagated from the instancer points
+    node_attr = nodes.new(type="ShaderNodeAttribute")
+    node_attr.attribute_type = attribute_type
+    node_attr.attribute_name = attribute_name
+    node_attr.location = 900, 0
+    # return color link
+    return node_attr.outputs[0]
+
+
+def make_new_nodes_attribute_material(
+    material, attribute_name: str, attribute_type: str = "INSTANCER"
+):
+    material.use_nodes = True
+    material.node_tree.nodes.clear()
+
+    color_link = _make_nodes_attribute_material(
+        material.node_tree, attribute_name, attribute_type
+    )
+
+    default_output_node = NodeOutput(
+        material.node_tree, input_color_link=color_link, location=(1200, 0)
+    )
+    return default_output_node
+
+
+def add_attribute_nodes_to_material(material, attribute_name: str):
+    material.use_nodes = True
+    return _make_nodes_attribute_material(material.node_tree, attribute_name)
+
+
 def make_nodes_vertex_color_material(
     material,
     vertex_attr_rgb: [str],
@@ -386,7 +441,46 @@ def create_or_get_material(name_material: str):
         return bpy.data.materials.new(name=name_material)
 
 
-def create_simple_material(base_color, name_material: str):
+# Materials shared between objects, keyed by the parameters that determine their
+# node tree. Values are (material, color selector).
+_shared_materials = {}
+
+
+def get_shared_material(key: tuple, create_f: typing.Callable):
+    """Return the material cached for `key` or create (and cache) it.
+
+    The material keeps the name it was created with, changes through its color
+    selector apply to all objects using it. Shared materials are not removed by
+    a DatablockRegistry.
+    """
+    try:
+        material, color_selector = _shared_materials[key]
+        if is_datablock_alive(material):
+            return material, color_selector
+    except KeyError:
+        pass
+
+    material, color_selector = create_f()
+    _shared_materials[key] = material, color_selector
+    mark_shared(material)
+    return material, color_selector
+
+
+def clear_shared_materials():
+    """Forget all shared materials, following calls create new ones."""
+    _shared_materials.clear()
+
+
+def create_simple_material(base_color, name_material: str, shared: bool = False):
+    """
+
+    :param shared: Reuse the material of an earlier call with the same base color
+    """
+    if shared:
+        return get_shared_material(
+            ("simple", tuple(base_color)),
+            lambda: create_simple_material(base_color, name_material),
+        )
     mat = create_or_get_material(name_material)
     color_selector = make_nodes_simple_material(mat, base_color)
     return mat, color_selector
@@ -398,13 +492,56 @@ def create_uv_mapped_material(color_image, name_material: str = "material_point_
     return mat, color_selector
 
 
+def create_attribute_material(
+    attribute_name: str,
+    name_material: str = "material_point_cloud",
+    attribute_type: str = "INSTANCER",
+    shared: bool = False,
+):
+    """
+
+    :param shared: Reuse the material of an earlier call with the same attribute
+    """
+    if shared:
+        return get_shared_material(
+            ("attribute", attribute_name, attribute_type),
+            lambda: create_attribute_material(
+                attribute_name, name_material, attribute_type
+            ),
+        )
+    mat = create_or_get_material(name_material)
+    color_selector = make_new_nodes_attribute_material(
+        mat, attribute_name, attribute_type
+    )
+    return mat, color_selector
+
+
 def create_vertex_color_material(
     vertex_attr_rgb: [str],
     vertex_attr_scalar: [str],
     default_color,
     mode: str = "select",
     name_material: str = "material_vertex_color",
+    shared: bool = False,
 ):
+    """
+
+    :param shared: Reuse the material of an earlier call with the same attributes,
+        default color and mode
+    """
+    if shared:
+        return get_shared_material(
+            (
+                "vertex_color",
+                tuple(vertex_attr_rgb),
+                tuple(vertex_attr_scalar),
+                tuple(default_color),
+                mode,
+            ),
+            lambda: create_vertex_color_material(
+                vertex_attr_rgb, vertex_attr_scalar, default_color, mode, name_material
+            ),
+        )
     mat = create_or_get_material(name_material)
     selector = make_nodes_vertex_color_material(
         mat, vertex_attr_rgb, vertex_attr_scalar, default_color, mode
@@ -412,10 +549,23 @@ def create_vertex_color_material(
     return mat, selector
 
 
-def create_flow_material(name_material: str):
+def create_flow_material(
+    name_material: str, attribute_type: str = "GEOMETRY", shared: bool = False
+):
+    """
+
+    :param shared: Reuse the material of an earlier call with the same attribute type
+    """
+    if shared:
+        material, _ = get_shared_material(
+            ("flow", attribute_type),
+            lambda: (create_flow_material(name_material, attribute_type), None),
+        )
+        return material
+
     # ### MATERIAL
     # Vertex color material
-    mat = bpy.data.materials.new(name="VertexColorMaterial")
+    mat = bpy.data.materials.new(name=name_material)
     mat.use_nodes = True
     nodes = mat.node_tree.nodes
     nodes.clear()
@@ -424,11 +574,13 @@ def create_flow_material(name_material: str):
     node_input = nodes.new(type="ShaderNodeAttribute")
     node_input.location = 0, 0
     node_input.attribute_name = "color_flow"
+    node_input.attribute_type = attribute_type
 
     # create attribute input node
     node_input_grads = nodes.new(type="ShaderNodeAttribute")
     node_input_grads.location = 0, -200
     node_input_grads.attribute_name = "color_flow"
+    node_input_grads.attribute_type = attribute_type
 
     # mix vertex colors with simple reconstruction material
     node_mix_rgb = nodes.new(type="ShaderNodeMixRGB")
@@ -442,7 +594,7 @@ def create_flow_material(name_material: str):
     node_color.inputs[1].default_value = 1.0
     node_color.inputs[4].default_value = (1.0, 1.0, 1.0, 1.0)
 
-    node_rgb_sep = nodes.new(type="ShaderNodeSeparateRGB")
+    node_rgb_sep = nodes.new(type="ShaderNodeSeparateColor")
 
     node_grad_value_mult = nodes.new(type="ShaderNodeMath")
     node_grad_value_mult.inputs[1].default_value = 1.2
@@ -181,7 +181,13 @@ def create_obj_from_mesh(
     scalar_values: {str: np.ndarray} = None,
     *,
     name_prefix: str,
+    shared_material: bool = False,
 ):
+    """
+
+    :param shared_material: Share the material with earlier meshes with the same
+        color attributes. Their vertex color selection is shared as well.
+    """
     obj_name = "{}_obj".format(name_prefix)
     try:
         if obj_name in bpy.data.objects:
@@ -206,6 +212,7 @@ def create_obj_from_mesh(
         default_color,
         mode="select",
         name_material="{}_material".format(name_prefix),
+        shared=shared_material,
     )
 
     # Todo: handle multiple vertex color layers
@@ -227,6 +234,7 @@ def add_object_from_mesh(
     *,
     scene,
     name_prefix: str,
+    shared_material: bool = False,
 ):
     obj, select_vertex_color = create_obj_from_mesh(
         vertices,
@@ -235,6 +243,7 @@ def add_object_from_mesh(
         face_colors,
         scalar_values,
         name_prefix=name_prefix,
+        shared_material=shared_material,
     )
 
     scene.collection.objects.link(obj)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Lazy access to the arrays of .npz data files."""
+
+import struct
+import typing
+import zipfile
+
+import numpy as np
+
+
+def _memmap_npz_member(filepath: str, zip_file: zipfile.ZipFile, member: str, mode):
+    """Memory-map an uncompressed .npy member of a .npz archive.
+
+    :return: np.memmap or None if the member cannot be mapped (compressed, object
+        dtype, ...).
+    """
+    info = zip_file.getinfo(member)
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(filepath, "rb") as fp:
+        # the local file header may have a different 'extra' field than the
+        # central directory entry in `info`
+        fp.seek(info.header_offset)
+        local_header = fp.read(30)
+        if local_header[:4] != b"PK\x03\x04":
+            return None
+        name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+        fp.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            header = np.lib.format.read_array_header_1_0(fp)
+        elif version == (2, 0):
+            header = np.lib.format.read_array_header_2_0(fp)
+        else:
+            return None
+        shape, fortran_order, dtype = header
+        offset = fp.tell()
+
+    if dtype.hasobject:
+        return None
+
+    return np.memmap(
+        filepath,
+        dtype=dtype,
+        mode=mode,
+        shape=shape,
+        order="F" if fortran_order else "C",
+        offset=offset,
+    )
+
+
+class LazyNpzArray:
+    """Array of a .npz file that is only read when `load` is called.
+
+    Uncompressed members are memory-mapped if `mmap_mode` is given, everything
+    else is read (and decompressed) on access. The file is only open during
+    `load`, so placeholders can be kept (or dropped) without leaking handles.
+    """
+
+    def __init__(self, filepath: str, key: str, mmap_mode: str = None):
+        self.filepath = filepath
+        self.key = key
+        self.mmap_mode = mmap_mode
+
+    def load(self) -> np.ndarray:
+        with np.load(self.filepath) as npz_file:
+            if self.mmap_mode is not None:
+                array = _memmap_npz_member(
+                    self.filepath,
+                    npz_file.zip,
+                    "{}.npy".format(self.key),
+                    self.mmap_mode,
+                )
+                if array is not None:
+                    return array
+            return npz_file[self.key]
+
+    def __repr__(self):
+        return "LazyNpzArray('{}', '{}')".format(self.filepath, self.key)
+
+
+def load_lazy_arrays(
+    kwargs: typing.Dict[str, typing.Any],
+) -> typing.Dict[str, typing.Any]:
+    """Replace all LazyNpzArray values of (nested) task arguments by their data."""
+
+    def load(value):
+        if isinstance(value, LazyNpzArray):
+            return value.load()
+        if isinstance(value, dict):
+            return {k: load(v) for k, v in value.items()}
+        return value
+
+    return {k: load(v) for k, v in kwargs.items()}
@@ -4,6 +4,8 @@
 import bmesh
 import bpy
 
+from .material_shader import get_shared_material
+
 
 def _create_ground_material(name: str = "ground_material"):
     if name in bpy.data.materials:
@@ -88,7 +90,11 @@ def create_ground(name_prefix: str = "ground"):
     bm.free()
 
     obj = bpy.data.objects.new("{}_obj".format(name_prefix), me)
-    material = _create_ground_material("{}_material".format(name_prefix))
+    # all grounds look the same
+    material, _ = get_shared_material(
+        ("ground",),
+        lambda: (_create_ground_material("{}_material".format(name_prefix)), None),
+    )
     obj.data.materials.append(material)
     return obj
 
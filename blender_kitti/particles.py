@@ -13,13 +13,54 @@ from .material_shader import (
     create_flow_material,
     create_simple_material,
     create_uv_mapped_material,
+    create_attribute_material,
     add_nodes_to_material,
+    uv_divide_node_names,
+    add_attribute_nodes_to_material,
 )
+from .culling import visible_mask
+from .datablocks import is_datablock_alive, mark_shared
+from .downsampling import downsample_point_cloud
+from .flow_colors import flow_colors
+from .lod import (
+    auto_icosphere_subdivisions,
+    billboard_corners,
+    camera_matrix_world,
+    lod_levels,
+)
+from .mesh import create_obj_from_mesh
+from .voxel_surface import quads_to_triangles, voxel_surface_quads
 
 # Max texture size of 8192 works on AMDs RDNA3 architecture
 MAX_TEXTURE_WIDTH_EXP = 13
 MAX_TEXTURE_WIDTH = 2**MAX_TEXTURE_WIDTH_EXP
 
+# 'faces': pseudo face per point, colors from a packed texture via instancer UVs.
+# 'geometry_nodes': single vertex per point, 'Instance on Points' node tree and
+# colors from a per-point color attribute.
+INSTANCER_BACKENDS = ("faces", "geometry_nodes")
+# 'instances': one cube particle instanced per occupied voxel.
+# 'surface': single mesh of the exposed voxel faces.
+VOXEL_MODES = ("instances", "surface")
+# 'mesh': all arrows baked into a single mesh.
+# 'instances': one arrow mesh instanced per flow vector via geometry nodes.
+FLOW_MODES = ("mesh", "instances")
+# Storage of per-point color attributes of the 'geometry_nodes' backend.
+# 'BYTE_COLOR' needs 4 instead of 16 bytes per point.
+COLOR_ATTRIBUTE_TYPES = ("FLOAT_COLOR", "BYTE_COLOR")
+
+INSTANCER_UV_LAYER = "per_vertex_dummy_uv"
+# Custom property of instancer objects listing the names of their color images
+# (or color attributes), in the order of the `colors` they were created from.
+COLOR_NAMES_PROPERTY = "blender_kitti_colors"
+# Color attributes of the 'geometry_nodes' backend have the same name in every
+# instancer (suffixed by the index for lists of colors), so all point clouds can
+# share one material.
+COLOR_ATTRIBUTE_NAME = "point_colors"
+# Custom property of 'faces' instancers listing [material, divide x, divide y] node
+# names of every color image. The divide nodes hold the image size.
+UV_DIVIDE_NODES_PROPERTY = "blender_kitti_uv_divide_nodes"
+
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -42,7 +83,16 @@ def _create_instancer_mesh(positions: np.ndarray, name="mesh_points"):
     if name in bpy.data.meshes:
         raise RuntimeError("Mesh '{}' already exists.".format(name))
     mesh = bpy.data.meshes.new(name=name)
+    _set_instancer_mesh_geometry(mesh, positions)
+    mesh.validate()
+
+    logger.info("Created instancer mesh with {} vertices.".format(len(positions)))
+
+    return mesh
 
+
+def _set_instancer_mesh_geometry(mesh, positions: np.ndarray):
+    """Fill an empty mesh with one pseudo face per point."""
     num_vertices = len(positions)
     mesh.vertices.add(num_vertices * 3)
     mesh.vertices.foreach_set("co", np.repeat(positions, 3, axis=0).reshape((-1)))
@@ -58,15 +108,43 @@ def _create_instancer_mesh(positions: np.ndarray, name="mesh_points"):
     mesh.polygons.foreach_set("loop_total", loop_total)
 
     mesh.update()
-    mesh.validate()
 
-    logger.info("Created instancer mesh with {} vertices.".format(len(positions)))
 
-    return mesh
+def _make_instancer_uvs(
+    num_points: int, texel_indices: np.ndarray = None
+) -> np.ndarray:
+    """Flat per-loop UV coordinates addressing one color texel per point.
+
+    Relies on the layout of `_create_instancer_mesh`: 3 loops per pseudo face and
+    loop i uses vertex i, so the UVs of point k are repeated for loops 3k..3k+2.
+
+    :param texel_indices: Color texel of every point, default: texel k for point k
+    """
+    if texel_indices is None:
+        uv_idx = np.arange(0, num_points, dtype=np.int64)
+    else:
+        uv_idx = np.asarray(texel_indices, dtype=np.int64)
+        assert uv_idx.shape == (num_points,)
+    # distribute into a 2D-texture with MAX_TEXTURE_WIDTH
+    uv_xy = np.empty((num_points, 2), dtype=np.float32)
+    uv_xy[:, 0] = uv_idx & (MAX_TEXTURE_WIDTH - 1)
+    uv_xy[:, 1] = uv_idx >> MAX_TEXTURE_WIDTH_EXP
+    return np.repeat(uv_xy, 3, axis=0).reshape((-1))
+
+
+def _set_instancer_uvs(mesh, num_points: int, texel_indices: np.ndarray = None):
+    if INSTANCER_UV_LAYER not in mesh.uv_layers:
+        mesh.uv_layers.new(name=INSTANCER_UV_LAYER)
+    mesh.uv_layers[INSTANCER_UV_LAYER].data.foreach_set(
+        "uv", _make_instancer_uvs(num_points, texel_indices)
+    )
 
 
 def _create_instancer_obj(
-    positions: np.ndarray, name_instancer_obj: str, name_mesh: str
+    positions: np.ndarray,
+    name_instancer_obj: str,
+    name_mesh: str,
+    texel_indices: np.ndarray = None,
 ):
     assert positions.ndim == 2 and positions.shape[1] == 3
 
@@ -78,25 +156,146 @@ def _create_instancer_obj(
     # mesh has 3 vertices for every instancer position
     assert len(mesh.vertices) % 3 == 0
 
-    uv_idx = np.repeat(np.arange(0, len(mesh.vertices) // 3), 3, axis=0)
-    # distribute into a 2D-texture with MAX_TEXTURE_WIDTH
-    uv_x = uv_idx & (MAX_TEXTURE_WIDTH - 1)
-    uv_y = uv_idx >> MAX_TEXTURE_WIDTH_EXP  # Since 2^14 = 16384
+    _set_instancer_uvs(mesh, len(positions), texel_indices)
+
+    obj_instancer = bpy.data.objects.new(name_instancer_obj, mesh)
+    return obj_instancer
+
 
-    uv_xy = np.stack([uv_x, uv_y], axis=-1)
-    # TODO(risteon): this can be created more efficiently with np and knowledge of the mesh struct
-    coords_flat = [
-        uv for pair in [uv_xy[loop.vertex_index] for loop in mesh.loops] for uv in pair
-    ]
+def _check_backend(backend: str, color_attribute_type: str = None):
+    if backend not in INSTANCER_BACKENDS:
+        raise ValueError("Unknown instancer backend '{}'.".format(backend))
+    if color_attribute_type is None:
+        return
+    if color_attribute_type not in COLOR_ATTRIBUTE_TYPES:
+        raise ValueError(
+            "Unknown color attribute type '{}'.".format(color_attribute_type)
+        )
+    if backend != "geometry_nodes":
+        raise ValueError(
+            "Color attributes require the 'geometry_nodes' instancer backend."
+        )
+
+
+def _create_point_mesh(positions: np.ndarray, name="mesh_points"):
+    """Create mesh with a single vertex (and no faces) per point."""
+    assert positions.ndim == 2
+    assert positions.shape[1] == 3
+
+    if name in bpy.data.meshes:
+        raise RuntimeError("Mesh '{}' already exists.".format(name))
+    mesh = bpy.data.meshes.new(name=name)
+
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.astype(np.float32).reshape((-1)))
+    mesh.update()
+
+    logger.info("Created point mesh with {} vertices.".format(len(positions)))
+
+    return mesh
+
+
+def _create_instance_on_points_node_group(
+    name: str,
+    *,
+    rotation_attribute: str = None,
+    scale_attribute: str = None,
+):
+    """Geometry nodes tree instancing the 'Object' input on every input point.
+
+    Per-instance rotation (quaternion) and scale (vector) are read from the named
+    point attributes, if given.
+    """
+    node_group = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    node_group.interface.new_socket(
+        "Geometry", in_out="INPUT", socket_type="NodeSocketGeometry"
+    )
+    node_group.interface.new_socket(
+        "Object", in_out="INPUT", socket_type="NodeSocketObject"
+    )
+    node_group.interface.new_socket(
+        "Geometry", in_out="OUTPUT", socket_type="NodeSocketGeometry"
+    )
+    nodes = node_group.nodes
 
-    mesh.uv_layers.new(name="per_vertex_dummy_uv")
-    mesh.uv_layers[-1].data.foreach_set("uv", coords_flat)
+    node_input = nodes.new(type="NodeGroupInput")
+    node_input.location = 0, 0
+
+    node_object_info = nodes.new(type="GeometryNodeObjectInfo")
+    node_object_info.inputs["As Instance"].default_value = True
+    node_object_info.location = 0, -200
+
+    node_instance = nodes.new(type="GeometryNodeInstanceOnPoints")
+    node_instance.location = 300, 0
+
+    node_output = nodes.new(type="NodeGroupOutput")
+    node_output.location = 600, 0
+
+    # link nodes
+    links = node_group.links
+    links.new(node_input.outputs["Geometry"], node_instance.inputs["Points"])
+    links.new(node_input.outputs["Object"], node_object_info.inputs["Object"])
+    links.new(node_object_info.outputs["Geometry"], node_instance.inputs["Instance"])
+    links.new(node_instance.outputs["Instances"], node_output.inputs[0])
+
+    for attribute_name, data_type, socket, location in (
+        (rotation_attribute, "QUATERNION", "Rotation", (0, -400)),
+        (scale_attribute, "FLOAT_VECTOR", "Scale", (0, -550)),
+    ):
+        if attribute_name is None:
+            continue
+        node_attr = nodes.new(type="GeometryNodeInputNamedAttribute")
+        node_attr.data_type = data_type
+        node_attr.inputs["Name"].default_value = attribute_name
+        node_attr.location = location
+        links.new(node_attr.outputs["Attribute"], node_instance.inputs[socket])
+    return node_group
+
+
+# Node groups shared by all geometry nodes instancers with the same attributes,
+# the particle object is an input of every modifier
+_node_groups = {}
+
+
+def _get_instance_on_points_node_group(
+    *, rotation_attribute: str = None, scale_attribute: str = None
+):
+    key = (rotation_attribute, scale_attribute)
+    node_group = _node_groups.get(key)
+    if node_group is None or not is_datablock_alive(node_group):
+        name = "_".join(["instance_on_points"] + [a for a in key if a is not None])
+        node_group = _create_instance_on_points_node_group(
+            name, rotation_attribute=rotation_attribute, scale_attribute=scale_attribute
+        )
+        _node_groups[key] = node_group
+        mark_shared(node_group)
+    return node_group
+
+
+def _create_geometry_nodes_instancer_obj(
+    positions: np.ndarray,
+    name_instancer_obj: str,
+    name_mesh: str,
+    obj_particle,
+    **node_group_kwargs,
+):
+    assert positions.ndim == 2 and positions.shape[1] == 3
+
+    if name_instancer_obj in bpy.data.objects:
+        raise RuntimeError("Object '{}' already exists.".format(name_instancer_obj))
+
+    mesh = _create_point_mesh(positions, name_mesh)
+    node_group = _get_instance_on_points_node_group(**node_group_kwargs)
 
     obj_instancer = bpy.data.objects.new(name_instancer_obj, mesh)
+    modifier = obj_instancer.modifiers.new("instance_on_points", "NODES")
+    modifier.node_group = node_group
+    socket_object = node_group.interface.items_tree["Object"]
+    modifier[socket_object.identifier] = obj_particle
     return obj_instancer
 
 
-def _create_color_image(colors_rgba: np.ndarray, name: str):
+def _colors_to_float_rgba(colors_rgba: np.ndarray) -> np.ndarray:
     assert colors_rgba.ndim == 2
     # dtype and alpha channel checks
     if colors_rgba.dtype == np.float32:
@@ -118,6 +317,28 @@ def _create_color_image(colors_rgba: np.ndarray, name: str):
             "Cannot handle colors_rgba with shape {}.".format(colors_rgba.shape)
         )
     assert colors_rgba.shape[1] == 4
+    return colors_rgba
+
+
+def _create_color_attribute(
+    mesh, colors_rgba: np.ndarray, name: str, attribute_type: str = "FLOAT_COLOR"
+):
+    """Store one color per vertex as point domain color attribute."""
+    assert attribute_type in COLOR_ATTRIBUTE_TYPES
+    colors_rgba = _colors_to_float_rgba(colors_rgba)
+    assert len(colors_rgba) == len(mesh.vertices)
+
+    if name in mesh.attributes:
+        raise RuntimeError("Attribute '{}' already exists.".format(name))
+
+    attribute = mesh.attributes.new(name=name, type=attribute_type, domain="POINT")
+    # colors are given in sRGB, like the pixels of the (non-float) color image
+    attribute.data.foreach_set("color_srgb", colors_rgba.reshape((-1)))
+    return attribute
+
+
+def _create_color_image(colors_rgba: np.ndarray, name: str):
+    colors_rgba = _colors_to_float_rgba(colors_rgba)
 
     if name in bpy.data.images:
         raise RuntimeError("Image '{}' already exists.".format(name))
@@ -125,26 +346,47 @@ def _create_color_image(colors_rgba: np.ndarray, name: str):
     image_num_rows = (len(colors_rgba) - 1) // MAX_TEXTURE_WIDTH + 1
     image_num_cols = min(len(colors_rgba), MAX_TEXTURE_WIDTH)
     image = bpy.data.images.new(name, image_num_cols, image_num_rows, alpha=True)
+    _write_color_image(image, colors_rgba)
+    return image
+
 
+def _write_color_image(image, colors_rgba: np.ndarray):
+    """Write float RGBA colors to the first texels of `image` and repack it."""
+    image_num_cols, image_num_rows = image.size
     colors_rgba = np.resize(colors_rgba, (image_num_rows * image_num_cols, 4))
     colors_rgba_flat = colors_rgba.reshape((-1))
     image.pixels.foreach_set(colors_rgba_flat)
     # super important. Otherwise the pixel data will just vanish from memory and be
     # lost for certain after saving + loading the file.
     image.pack()
-    return image
 
 
 def _create_particle_instancer(
     name_prefix: str,
     positions: np.ndarray,
     obj_particle,
+    backend: str = "faces",
+    texel_indices: np.ndarray = None,
 ):
+    """
+
+    :param texel_indices: 'faces' backend only, color texel of every point
+    """
+    _check_backend(backend)
     # created entities
     name_mesh = "{}_mesh".format(name_prefix)
     name_obj = "{}_obj_instancer".format(name_prefix)
 
-    obj_instancer = _create_instancer_obj(positions, name_obj, name_mesh)
+    if backend == "geometry_nodes":
+        obj_instancer = _create_geometry_nodes_instancer_obj(
+            positions, name_obj, name_mesh, obj_particle
+        )
+        # the prototype is only referenced by the node tree
+        obj_particle.hide_render = True
+        obj_particle.hide_viewport = True
+        return obj_instancer
+
+    obj_instancer = _create_instancer_obj(positions, name_obj, name_mesh, texel_indices)
 
     obj_particle.parent = obj_instancer
     # instancing from 'fake' faces is necessary for uv mapping to work.
@@ -153,14 +395,47 @@ def _create_particle_instancer(
     return obj_instancer
 
 
-def _add_material_to_particle(name_prefix, colors, obj_particle, material=None):
+def _add_material_to_particle(
+    name_prefix,
+    colors,
+    obj_particle,
+    material=None,
+    obj_instancer=None,
+    color_attribute_type: str = None,
+    point_indices: typing.List[np.ndarray] = None,
+    shared: bool = False,
+):
     """
 
     :param name_prefix:
     :param colors:
-    :param obj_particle:
+    :param obj_particle: Particle object or list of particle objects that all use
+        the same materials
+    :param material:
+    :param obj_instancer: If given and it carries a geometry nodes instancer, colors
+        are stored as point attributes of its mesh instead of a color image.
+        List if obj_particle is a list.
+    :param color_attribute_type: One of COLOR_ATTRIBUTE_TYPES, default 'FLOAT_COLOR'
+    :param point_indices: Points (indices into colors) of every instancer, if the
+        instancers hold subsets of the points
+    :param shared: Reuse the materials of earlier instancers with the same color
+        attributes ('geometry_nodes' backend only, the color images of the 'faces'
+        backend belong to a single instancer)
     :return:
     """
+    if color_attribute_type is None:
+        color_attribute_type = "FLOAT_COLOR"
+
+    if isinstance(obj_particle, list):
+        obj_particles, obj_instancers = obj_particle, obj_instancer
+    else:
+        obj_particles, obj_instancers = [obj_particle], [obj_instancer]
+    if point_indices is None:
+        point_indices = [None] * len(obj_instancers)
+
+    use_attributes = obj_instancers[0] is not None and any(
+        m.type == "NODES" for m in obj_instancers[0].modifiers
+    )
 
     name_image = "{}_colors".format(name_prefix)
     name_material = "{}_material".format(name_prefix)
@@ -170,34 +445,111 @@ def _add_material_to_particle(name_prefix, colors, obj_particle, material=None):
             colors = [colors]
             name_image = [name_image]
             name_material = [name_material]
+            name_attribute = [COLOR_ATTRIBUTE_NAME]
         else:
             name_image = [f"{name_image}_{i}" for i in range(len(colors))]
             name_material = [f"{name_material}_{i}" for i in range(len(colors))]
+            name_attribute = [f"{COLOR_ATTRIBUTE_NAME}_{i}" for i in range(len(colors))]
+        if use_attributes and shared:
+            # the first point cloud must not name the material of all others
+            name_material = [f"{na}_material" for na in name_attribute]
+
+        for obj_inst, indices in zip(obj_instancers, point_indices):
+            # instancers of point subsets cannot be updated
+            if obj_inst is not None and indices is None:
+                obj_inst[COLOR_NAMES_PROPERTY] = (
+                    name_attribute if use_attributes else name_image
+                )
 
         color_selector = []
-        for color_arr, ni, nm in zip(colors, name_image, name_material):
-            image = _create_color_image(color_arr, ni)
-            if material is None:
-                # the particle obj will use this material
-                logger.info(f"Creating material {ni}.")
-                _material, _cs = create_uv_mapped_material(image, nm)
+        uv_divide_nodes = []
+        for color_arr, ni, na, nm in zip(
+            colors, name_image, name_attribute, name_material
+        ):
+            if use_attributes:
+                for obj_inst, indices in zip(obj_instancers, point_indices):
+                    _create_color_attribute(
+                        obj_inst.data,
+                        color_arr if indices is None else color_arr[indices],
+                        na,
+                        color_attribute_type,
+                    )
+                if material is None:
+                    # the particle obj will use this material
+                    logger.info(f"Creating material {nm}.")
+                    _material, _cs = create_attribute_material(na, nm, shared=shared)
+                else:
+                    _cs = add_attribute_nodes_to_material(material, na)
+                    _material = material
             else:
-                # Todo (risteon) does return color link, not color selector
-                _cs = add_nodes_to_material(material, image)
-                _material = material
-
-            obj_particle.data.materials.append(_material)
+                image = _create_color_image(color_arr, ni)
+                if material is None:
+                    # the particle obj will use this material
+                    logger.info(f"Creating material {ni}.")
+                    _material, _cs = create_uv_mapped_material(image, nm)
+                else:
+                    # Todo (risteon) does return color link, not color selector
+                    _cs = add_nodes_to_material(material, image)
+                    _material = material
+                uv_divide_nodes.append([_material.name, *uv_divide_node_names(image)])
+
+            for obj in obj_particles:
+                _append_particle_material(obj, _material)
             color_selector.append(_cs)
+
+        for obj_inst, indices in zip(obj_instancers, point_indices):
+            if obj_inst is not None and indices is None and not use_attributes:
+                obj_inst[UV_DIVIDE_NODES_PROPERTY] = uv_divide_nodes
     else:
         material, color_selector = create_simple_material(
-            base_color=(0.1, 0.1, 0.1, 1.0), name_material=name_material
+            base_color=(0.1, 0.1, 0.1, 1.0), name_material=name_material, shared=True
         )
-        obj_particle.data.materials.append(material)
+        for obj in obj_particles:
+            _append_particle_material(obj, material)
 
     return color_selector
 
 
-def create_cube(name_prefix: str, *, edge_length: float = 0.16):
+# Particle meshes shared by all particle objects with the same shape parameters
+_prototype_meshes = {}
+
+
+def _get_prototype_mesh(key: tuple, create_mesh_f: typing.Callable):
+    mesh = _prototype_meshes.get(key)
+    if mesh is None or not is_datablock_alive(mesh):
+        mesh = create_mesh_f()
+        _prototype_meshes[key] = mesh
+        mark_shared(mesh)
+    return mesh
+
+
+def _is_prototype_mesh(mesh) -> bool:
+    return any(m == mesh for m in _prototype_meshes.values())
+
+
+def _append_particle_material(obj_particle, material):
+    """Append a material to the particle object.
+
+    Prototype meshes are shared, so their materials are linked to the object.
+    """
+    mesh = obj_particle.data
+    if not _is_prototype_mesh(mesh):
+        mesh.materials.append(material)
+        return
+
+    slot_index = sum(
+        1
+        for slot in obj_particle.material_slots
+        if slot.link == "OBJECT" and slot.material is not None
+    )
+    while len(mesh.materials) <= slot_index:
+        mesh.materials.append(None)
+    slot = obj_particle.material_slots[slot_index]
+    slot.link = "OBJECT"
+    slot.material = material
+
+
+def _create_cube_mesh(name: str, edge_length: float):
     bm = bmesh.new()
     bmesh.ops.create_cube(
         bm,
@@ -205,20 +557,36 @@ def create_cube(name_prefix: str, *, edge_length: float = 0.16):
         calc_uvs=False,
     )
 
-    me = bpy.data.meshes.new("{}_mesh".format(name_prefix))
+    me = bpy.data.meshes.new(name)
     bm.to_mesh(me)
     bm.free()
+    return me
+
+
+def create_cube(
+    name_prefix: str, *, edge_length: float = 0.16, shared_mesh: bool = False
+):
+    """
+
+    :param shared_mesh: Use the mesh shared by all cubes of this edge length
+    """
+    name_mesh = "{}_mesh".format(name_prefix)
+    if shared_mesh:
+        me = _get_prototype_mesh(
+            ("cube", edge_length),
+            lambda: _create_cube_mesh(
+                "prototype_cube_{}".format(edge_length), edge_length
+            ),
+        )
+    else:
+        me = _create_cube_mesh(name_mesh, edge_length)
 
     obj = bpy.data.objects.new("{}_obj".format(name_prefix), me)
     return obj
 
 
-def create_icosphere(
-    name_prefix: str,
-    *,
-    subdivisions: int = 3,
-    radius: float = 0.02,
-    use_smooth: bool = True,
+def _create_icosphere_mesh(
+    name: str, subdivisions: int, radius: float, use_smooth: bool
 ):
     bm = bmesh.new()
     bmesh.ops.create_icosphere(
@@ -228,7 +596,7 @@ def create_icosphere(
         calc_uvs=False,
     )
 
-    mesh = bpy.data.meshes.new("{}_mesh".format(name_prefix))
+    mesh = bpy.data.meshes.new(name)
     bm.to_mesh(mesh)
     bm.free()
 
@@ -236,6 +604,60 @@ def create_icosphere(
         "use_smooth",
         np.full(fill_value=use_smooth, shape=[len(mesh.polygons)], dtype=bool),
     )
+    return mesh
+
+
+def create_icosphere(
+    name_prefix: str,
+    *,
+    subdivisions: int = 3,
+    radius: float = 0.02,
+    use_smooth: bool = True,
+    shared_mesh: bool = False,
+):
+    """
+
+    :param shared_mesh: Use the mesh shared by all icospheres with the same
+        subdivisions, radius and shading
+    """
+    args = subdivisions, radius, use_smooth
+    if shared_mesh:
+        mesh = _get_prototype_mesh(
+            ("icosphere",) + args,
+            lambda: _create_icosphere_mesh(
+                "prototype_icosphere_{}_{}".format(subdivisions, radius), *args
+            ),
+        )
+    else:
+        mesh = _create_icosphere_mesh("{}_mesh".format(name_prefix), *args)
+
+    obj = bpy.data.objects.new("{}_obj".format(name_prefix), mesh)
+    return obj
+
+
+def create_billboard(
+    name_prefix: str, *, radius: float, camera, shared_mesh: bool = False
+):
+    """Single quad particle parallel to the image plane of `camera`.
+
+    :param shared_mesh: Use the mesh shared by all billboards of this radius and
+        camera orientation
+    """
+
+    def create_mesh(name):
+        mesh = bpy.data.meshes.new(name)
+        mesh.from_pydata(billboard_corners(camera, radius).tolist(), [], [(0, 1, 2, 3)])
+        mesh.update()
+        return mesh
+
+    if shared_mesh:
+        orientation = tuple(np.round(camera_matrix_world(camera)[:3, :3], 6).flat)
+        mesh = _get_prototype_mesh(
+            ("billboard", radius, orientation),
+            lambda: create_mesh("prototype_billboard_{}".format(radius)),
+        )
+    else:
+        mesh = create_mesh("{}_mesh".format(name_prefix))
 
     obj = bpy.data.objects.new("{}_obj".format(name_prefix), mesh)
     return obj
@@ -247,20 +669,158 @@ def create_voxel_particle_obj(
     name_prefix: str,
     scene,
     material=None,
+    backend: str = "faces",
+    color_attribute_type: str = None,
+    edge_length: float = 0.16,
+    shared_material: bool = False,
 ):
-    obj_particle = create_cube(name_prefix + "_cube")
+    _check_backend(backend, color_attribute_type)
+    obj_particle = create_cube(
+        name_prefix + "_cube", edge_length=edge_length, shared_mesh=True
+    )
     scene.collection.objects.link(obj_particle)
 
-    obj_voxels = _create_particle_instancer(name_prefix, coords, obj_particle)
+    obj_voxels = _create_particle_instancer(name_prefix, coords, obj_particle, backend)
     if scene is not None:
         scene.collection.objects.link(obj_voxels)
 
     color_selector = _add_material_to_particle(
-        name_prefix, colors, obj_particle, material
+        name_prefix,
+        colors,
+        obj_particle,
+        material,
+        obj_instancer=obj_voxels,
+        color_attribute_type=color_attribute_type,
+        shared=shared_material,
     )
     return obj_voxels, color_selector
 
 
+def _voxel_coords(
+    grid_indices: typing.Tuple[np.ndarray, np.ndarray, np.ndarray],
+    voxel_size: typing.Union[float, np.ndarray],
+    origin: np.ndarray = None,
+):
+    """[N, 3] float32 positions of the voxels at the given per-axis grid indices."""
+    dtype = np.float32
+    coords = np.stack(grid_indices, axis=-1).astype(dtype)
+    coords *= np.broadcast_to(np.asarray(voxel_size, dtype=dtype), (3,))
+    if origin is not None:
+        coords += np.asarray(origin, dtype=dtype)
+    return coords
+
+
+def _add_voxel_particles(
+    scene,
+    *,
+    coords: np.ndarray,
+    colors: np.ndarray = None,
+    name_prefix: str = "voxels",
+    material=None,
+    backend: str = "faces",
+    color_attribute_type: str = None,
+    edge_length: float = 0.16,
+    cull: str = None,
+):
+    if cull is not None:
+        # cubes lie between their inner and outer sphere
+        visible = visible_mask(
+            scene,
+            coords,
+            radius=0.5 * np.sqrt(3.0) * edge_length,
+            mode=cull,
+            occluder_radius=0.5 * edge_length,
+        )
+        coords = coords[visible]
+        colors = None if colors is None else colors[visible]
+
+    obj_voxels, color_selector = create_voxel_particle_obj(
+        coords,
+        colors,
+        name_prefix,
+        scene,
+        material,
+        backend,
+        color_attribute_type,
+        edge_length=edge_length,
+        shared_material=True,
+    )
+    return obj_voxels, {"color_selector": color_selector}
+
+
+def _add_voxel_surface(
+    scene,
+    *,
+    vertices: np.ndarray,
+    triangles: np.ndarray,
+    triangle_colors: typing.Union[np.ndarray, None],
+    name_prefix: str = "voxels",
+):
+    face_colors = None if triangle_colors is None else {"voxels": triangle_colors}
+    obj_voxels, color_selector = create_obj_from_mesh(
+        vertices, triangles, face_colors=face_colors, name_prefix=name_prefix
+    )
+    if face_colors is not None:
+        color_selector("fcolor_voxels")
+    scene.collection.objects.link(obj_voxels)
+    return obj_voxels, {"color_selector": color_selector}
+
+
+def prepare_voxels(
+    *,
+    voxels: np.ndarray,
+    colors: np.ndarray = None,
+    voxel_size: typing.Union[float, np.ndarray] = 0.2,
+    origin: np.ndarray = None,
+    mode: str = "instances",
+    greedy_merge: bool = False,
+    **kwargs,
+):
+    """NumPy-only part of `add_voxels`, safe to run outside of the main thread.
+
+    :return: Function that creates the Blender data and its keyword arguments.
+        Remaining `kwargs` are passed through.
+    """
+    assert voxels.ndim == 3
+    assert voxels.dtype == bool
+    if mode not in VOXEL_MODES:
+        raise ValueError("Unknown voxel mode '{}'.".format(mode))
+
+    if mode == "surface":
+        vertices, quads, quad_colors = voxel_surface_quads(
+            voxels, colors, voxel_size=voxel_size, origin=origin, greedy=greedy_merge
+        )
+        triangles, triangle_colors = quads_to_triangles(quads, quad_colors)
+        logger.info(
+            "Created voxel surface with {} quads for {} voxels.".format(
+                len(quads), np.count_nonzero(voxels)
+            )
+        )
+        # only used for particles
+        for key in ("material", "backend", "color_attribute_type", "cull"):
+            kwargs.pop(key, None)
+        return _add_voxel_surface, dict(
+            kwargs,
+            vertices=vertices,
+            triangles=triangles,
+            triangle_colors=triangle_colors,
+        )
+
+    # only the occupied cells
+    grid_indices = np.nonzero(voxels)
+    coords = _voxel_coords(grid_indices, voxel_size, origin)
+    if colors is not None:
+        colors = colors[grid_indices]
+
+    return _add_voxel_particles, dict(
+        kwargs,
+        coords=coords,
+        colors=colors,
+        # keep a gap between neighboring voxels
+        edge_length=0.8 * float(np.min(voxel_size)),
+    )
+
+
 def add_voxels(
     scene,
     *,
@@ -268,6 +828,13 @@ def add_voxels(
     colors: np.ndarray = None,
     name_prefix: str = "voxels",
     material=None,
+    backend: str = "faces",
+    color_attribute_type: str = None,
+    voxel_size: typing.Union[float, np.ndarray] = 0.2,
+    origin: np.ndarray = None,
+    mode: str = "instances",
+    greedy_merge: bool = False,
+    cull: str = None,
 ):
     """
 
@@ -276,24 +843,57 @@ def add_voxels(
     :param name_prefix:
     :param scene:
     :param material:
+    :param voxel_size: Scalar or per-axis voxel edge length
+    :param origin: Position of voxel (0, 0, 0), defaults to the world origin
+    :param mode: One of VOXEL_MODES. 'surface' creates a single mesh of the exposed
+        voxel faces with per-face colors (uint8), material and backend are ignored.
+    :param greedy_merge: 'surface' mode only, merge coplanar faces of equal color
+    :param backend: Instancer backend, one of INSTANCER_BACKENDS
+    :param color_attribute_type: 'geometry_nodes' backend only, one of
+        COLOR_ATTRIBUTE_TYPES
+    :param cull: 'instances' mode only, one of culling.CULL_MODES to drop voxels
+        that are not visible in any camera of the scene
     :return:
     """
-    assert voxels.ndim == 3
-    assert voxels.dtype == bool
-
-    dtype = np.float32
-    deltas = np.asarray([0.2, 0.2, 0.2], dtype=dtype)
+    build_f, build_kwargs = prepare_voxels(
+        voxels=voxels,
+        colors=colors,
+        voxel_size=voxel_size,
+        origin=origin,
+        mode=mode,
+        greedy_merge=greedy_merge,
+        name_prefix=name_prefix,
+        material=material,
+        backend=backend,
+        color_attribute_type=color_attribute_type,
+        cull=cull,
+    )
+    return build_f(scene, **build_kwargs)
 
-    coords = np.mgrid[[slice(x) for x in voxels.shape]].astype(dtype)
-    coords = np.moveaxis(coords, 0, 3)
-    coords *= deltas
-    coords = coords[voxels]
-    colors = colors[voxels]
 
-    obj_voxels, color_selector = create_voxel_particle_obj(
-        coords, colors, name_prefix, scene, material
+def prepare_voxel_list(
+    *,
+    indices: np.ndarray,
+    grid_shape: np.ndarray,
+    grid_origin: np.ndarray,
+    voxel_size: np.ndarray,
+    colors: np.ndarray = None,
+    edge_length: float = None,
+    **kwargs,
+):
+    """NumPy-only part of `add_voxel_list`, see `prepare_voxels`."""
+    assert indices.ndim == 1
+    assert grid_shape.ndim == 1
+    assert colors is None or indices.shape[0] == colors.shape[0]
+
+    grid_indices = np.unravel_index(indices, tuple(grid_shape))
+    coords = _voxel_coords(grid_indices, voxel_size, grid_origin)
+    if edge_length is None:
+        # keep a gap between neighboring voxels, like `prepare_voxels`
+        edge_length = 0.8 * float(np.min(voxel_size))
+    return _add_voxel_particles, dict(
+        kwargs, coords=coords, colors=colors, edge_length=edge_length
     )
-    return obj_voxels, {"color_selector": color_selector}
 
 
 def add_voxel_list(
@@ -305,28 +905,75 @@ def add_voxel_list(
     colors: np.ndarray = None,
     name_prefix: str = "voxel_list",
     scene,
+    backend: str = "faces",
+    color_attribute_type: str = None,
+    cull: str = None,
+    edge_length: float = None,
 ):
-    """"""
-    assert indices.ndim == 1
-    assert grid_shape.ndim == 1
-    assert indices.shape[0] == colors.shape[0]
+    """
 
-    dtype = np.float32
-    # cubic voxels
-    deltas = np.repeat(voxel_size, 3)
+    :param indices: Flat indices of the occupied cells of the grid
+    :param voxel_size: Scalar or per-axis voxel edge length
+    :param edge_length: Edge length of the voxel cubes, default: 0.8 times the
+        smallest voxel size
+    """
+    build_f, build_kwargs = prepare_voxel_list(
+        indices=indices,
+        grid_shape=grid_shape,
+        grid_origin=grid_origin,
+        voxel_size=voxel_size,
+        colors=colors,
+        edge_length=edge_length,
+        name_prefix=name_prefix,
+        backend=backend,
+        color_attribute_type=color_attribute_type,
+        cull=cull,
+    )
+    return build_f(scene, **build_kwargs)
 
-    coords = np.mgrid[[slice(x) for x in grid_shape]].astype(dtype)
-    coords = np.moveaxis(coords, 0, 3)
-    coords *= deltas
-    coords += grid_origin
 
-    coords = coords.reshape([-1, 3])
-    coords = coords[indices]
+def _downsample_points(
+    points: np.ndarray,
+    colors,
+    downsample: typing.Union[float, None],
+    max_points: typing.Union[int, None],
+    color_reduction: str,
+):
+    """Options 'downsample' and 'max_points' of `add_point_cloud`."""
+    if downsample is None and max_points is None:
+        return points, colors
+    return downsample_point_cloud(
+        points,
+        colors,
+        voxel_size=downsample,
+        max_points=max_points,
+        color_reduction=color_reduction,
+    )
 
-    obj_voxels, color_selector = create_voxel_particle_obj(
-        coords, colors, name_prefix, scene
+
+def prepare_point_cloud(
+    *,
+    points: np.ndarray,
+    colors=None,
+    downsample: float = None,
+    max_points: int = None,
+    color_reduction: str = "mean",
+    **kwargs,
+):
+    """NumPy-only part of `add_point_cloud`, see `prepare_voxels`.
+
+    Downsamples the points and converts them to contiguous float32 and colors to
+    float32 RGBA.
+    """
+    points, colors = _downsample_points(
+        points, colors, downsample, max_points, color_reduction
     )
-    return obj_voxels, {"color_selector": color_selector}
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    if isinstance(colors, np.ndarray):
+        colors = _colors_to_float_rgba(colors)
+    elif colors is not None:
+        colors = [_colors_to_float_rgba(c) for c in colors]
+    return add_point_cloud, dict(kwargs, points=points, colors=colors)
 
 
 def add_point_cloud(
@@ -340,6 +987,13 @@ def add_point_cloud(
     particle_radius: float = 0.02,
     material=None,
     particle_obj=None,
+    backend: str = "faces",
+    color_attribute_type: str = None,
+    subdivisions: typing.Union[int, str] = 3,
+    cull: str = None,
+    downsample: float = None,
+    max_points: int = None,
+    color_reduction: str = "mean",
 ):
     """
 
@@ -352,21 +1006,79 @@ def add_point_cloud(
     :param particle_radius:
     :param material: If given, just add nodes to this material
     :param particle_obj: If given, use this object
+    :param backend: Instancer backend, one of INSTANCER_BACKENDS. 'geometry_nodes'
+        uses a single vertex per point and stores colors as point attributes.
+    :param color_attribute_type: 'geometry_nodes' backend only, one of
+        COLOR_ATTRIBUTE_TYPES. 'BYTE_COLOR' stores 4 bytes per point.
+    :param subdivisions: Icosphere subdivisions of the particle or 'auto' to choose
+        them from the particle size on screen in the scene camera (at most 3).
+        Particles share the icosphere mesh of the same shape.
+        'lod' splits the points into one instancer per level of detail below a
+        single parent object, see `_add_point_cloud_lod`. Such point clouds cannot
+        be updated.
+    :param cull: One of culling.CULL_MODES to drop points that are not visible in
+        any camera of the scene. Cameras have to be added before the point cloud.
+    :param downsample: Voxel size, replace the points of every voxel by their
+        centroid (see `downsampling.downsample_point_cloud`)
+    :param max_points: Downsample with the voxel size that keeps about this many
+        points
+    :param color_reduction: One of downsampling.COLOR_REDUCTIONS, 'majority' for
+        label colors
     :return:
     """
+    _check_backend(backend, color_attribute_type)
+    points, colors = _downsample_points(
+        points, colors, downsample, max_points, color_reduction
+    )
+    if cull is not None:
+        visible = visible_mask(scene, points, radius=particle_radius, mode=cull)
+        points = points[visible]
+        if isinstance(colors, np.ndarray):
+            colors = colors[visible]
+        elif colors is not None:
+            colors = [c[visible] for c in colors]
+
+    if subdivisions == "lod" and particle_obj is None:
+        if scene.camera is not None:
+            return _add_point_cloud_lod(
+                scene,
+                points=points,
+                colors=colors,
+                name_prefix=name_prefix,
+                particle_radius=particle_radius,
+                material=material,
+                backend=backend,
+                color_attribute_type=color_attribute_type,
+            )
+        logger.info("No scene camera, using a single level of detail.")
+        subdivisions = 3
+
     if particle_obj is None:
+        if subdivisions == "auto":
+            subdivisions = auto_icosphere_subdivisions(scene, points, particle_radius)
         # created entities
         obj_particle = create_icosphere(
-            name_prefix + "_icosphere", radius=particle_radius
+            name_prefix + "_icosphere",
+            subdivisions=subdivisions,
+            radius=particle_radius,
+            shared_mesh=True,
         )
         scene.collection.objects.link(obj_particle)
     else:
         obj_particle = particle_obj
 
-    obj_point_cloud = _create_particle_instancer(name_prefix, points, obj_particle)
+    obj_point_cloud = _create_particle_instancer(
+        name_prefix, points, obj_particle, backend
+    )
     scene.collection.objects.link(obj_point_cloud)
     color_selector = _add_material_to_particle(
-        name_prefix, colors, obj_particle, material
+        name_prefix,
+        colors,
+        obj_particle,
+        material,
+        obj_instancer=obj_point_cloud,
+        color_attribute_type=color_attribute_type,
+        shared=True,
     )
     # works on GPU without color:
     # color_selector = _add_material_to_particle(
@@ -379,16 +1091,217 @@ def add_point_cloud(
     )
 
 
+def _add_point_cloud_lod(
+    scene,
+    *,
+    points: np.ndarray,
+    colors=None,
+    name_prefix: str,
+    particle_radius: float,
+    material=None,
+    backend: str = "faces",
+    color_attribute_type: str = None,
+):
+    """Point cloud with cheaper particles for points far from the scene camera.
+
+    Points are grouped by their level of detail (see `lod.lod_levels`): icospheres
+    with 3, 2 or 1 subdivisions and camera facing billboards for sub-pixel points.
+    Every level is a separate instancer named '<name_prefix>_lod<level>', all
+    levels use the same color image (or attribute names) and materials. The
+    instancers are children of an empty object named '<name_prefix>_lod'.
+
+    :return: parent object, dict with the color selector, the particle objects and
+        the instancers (fine to coarse)
+    """
+    levels = lod_levels(scene, scene.camera, points, particle_radius)
+
+    name_parent = "{}_lod".format(name_prefix)
+    if name_parent in bpy.data.objects:
+        raise RuntimeError("Object '{}' already exists.".format(name_parent))
+    obj_parent = bpy.data.objects.new(name_parent, None)
+    scene.collection.objects.link(obj_parent)
+
+    obj_particles = []
+    obj_instancers = []
+    point_indices = []
+    for level in np.unique(levels)[::-1]:
+        indices = np.flatnonzero(levels == level)
+        name_level = "{}_lod{}".format(name_prefix, level)
+        if level == 0:
+            obj_particle = create_billboard(
+                name_level + "_billboard",
+                radius=particle_radius,
+                camera=scene.camera,
+                shared_mesh=True,
+            )
+        else:
+            obj_particle = create_icosphere(
+                name_level + "_icosphere",
+                subdivisions=int(level),
+                radius=particle_radius,
+                shared_mesh=True,
+            )
+        scene.collection.objects.link(obj_particle)
+
+        # 'faces' instancers address the texels of all points
+        obj_instancer = _create_particle_instancer(
+            name_level, points[indices], obj_particle, backend, texel_indices=indices
+        )
+        scene.collection.objects.link(obj_instancer)
+        obj_instancer.parent = obj_parent
+
+        obj_particles.append(obj_particle)
+        obj_instancers.append(obj_instancer)
+        point_indices.append(indices)
+        logger.info("Level of detail {}: {} points.".format(level, len(indices)))
+
+    color_selector = _add_material_to_particle(
+        name_prefix,
+        colors,
+        obj_particles,
+        material,
+        obj_instancer=obj_instancers,
+        color_attribute_type=color_attribute_type,
+        point_indices=point_indices,
+        shared=True,
+    )
+    return (
+        obj_parent,
+        {
+            "color_selector": color_selector,
+            "obj_particle": obj_particles,
+            "obj_instancers": obj_instancers,
+        },
+    )
+
+
+def _image_capacity(image) -> int:
+    return image.size[0] * image.size[1]
+
+
+def _resize_uv_color_image(image, num_points: int, divide_nodes: typing.List[str]):
+    """Grow a color image of the 'faces' backend to hold `num_points` texels.
+
+    The texture size is baked into the divide nodes of the UV mapped material
+    (see `material_shader._make_nodes_uv_mapped_material`), update those as well.
+
+    :param divide_nodes: Material, divide x and divide y node names, see
+        UV_DIVIDE_NODES_PROPERTY
+    """
+    image_num_rows = (num_points - 1) // MAX_TEXTURE_WIDTH + 1
+    image_num_cols = min(num_points, MAX_TEXTURE_WIDTH)
+    image.scale(image_num_cols, image_num_rows)
+
+    name_material, *names_divide = divide_nodes
+    nodes = bpy.data.materials[name_material].node_tree.nodes
+    for name, size in zip(names_divide, (image_num_cols, image_num_rows)):
+        nodes[name].inputs[1].default_value = float(size)
+
+
+def update_point_cloud(
+    obj_instancer,
+    *,
+    points: np.ndarray,
+    colors: typing.Union[np.ndarray, typing.List[np.ndarray]] = None,
+):
+    """Replace points and colors of an instancer created by `add_point_cloud`.
+
+    Mesh, color images/attributes and materials are reused. If the number of points
+    is unchanged, positions and colors are overwritten in place. Otherwise the mesh
+    geometry is rebuilt and color images are only enlarged if they are too small.
+
+    :param obj_instancer: Instancer object returned by `add_point_cloud`, not of
+        subdivisions='lod'
+    :param points: [N, 3] new point positions
+    :param colors: New colors, same structure (single array or list) as on creation.
+        May only be omitted if the number of points does not grow.
+    :return: obj_instancer
+    """
+    if obj_instancer.type != "MESH":
+        raise ValueError(
+            "Cannot update '{}', point clouds with subdivisions='lod' have to be "
+            "added again.".format(obj_instancer.name)
+        )
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    assert points.ndim == 2 and points.shape[1] == 3
+
+    mesh = obj_instancer.data
+    use_attributes = any(m.type == "NODES" for m in obj_instancer.modifiers)
+    # pseudo face with 3 vertices per point for the 'faces' backend
+    num_points_old = len(mesh.vertices) // (1 if use_attributes else 3)
+    num_points = len(points)
+
+    color_names = list(obj_instancer.get(COLOR_NAMES_PROPERTY, []))
+    if isinstance(colors, np.ndarray):
+        colors = [colors]
+    if colors is not None and len(colors) != len(color_names):
+        raise ValueError(
+            "Expected {} color arrays, got {}.".format(len(color_names), len(colors))
+        )
+    if colors is None and color_names:
+        if use_attributes and num_points != num_points_old:
+            raise ValueError("Colors are required if the number of points changes.")
+        if not use_attributes and num_points > num_points_old:
+            raise ValueError("Colors are required if the number of points grows.")
+
+    if use_attributes:
+        attribute_types = [mesh.attributes[n].data_type for n in color_names]
+        if num_points == num_points_old:
+            mesh.attributes["position"].data.foreach_set("vector", points.reshape(-1))
+        else:
+            # also removes all color attributes
+            mesh.clear_geometry()
+            mesh.vertices.add(num_points)
+            mesh.vertices.foreach_set("co", points.reshape(-1))
+        mesh.update()
+
+        for name, attribute_type, color_arr in zip(
+            color_names, attribute_types, colors or []
+        ):
+            if name in mesh.attributes:
+                colors_rgba = _colors_to_float_rgba(color_arr)
+                assert len(colors_rgba) == num_points
+                mesh.attributes[name].data.foreach_set(
+                    "color_srgb", colors_rgba.reshape(-1)
+                )
+            else:
+                _create_color_attribute(mesh, color_arr, name, attribute_type)
+    else:
+        if num_points == num_points_old:
+            mesh.attributes["position"].data.foreach_set(
+                "vector", np.repeat(points, 3, axis=0).reshape(-1)
+            )
+            mesh.update()
+        else:
+            mesh.clear_geometry()
+            _set_instancer_mesh_geometry(mesh, points)
+            _set_instancer_uvs(mesh, num_points)
+
+        uv_divide_nodes = obj_instancer.get(UV_DIVIDE_NODES_PROPERTY, [])
+        for name, divide_nodes, color_arr in zip(
+            color_names, uv_divide_nodes, colors or []
+        ):
+            image = bpy.data.images[name]
+            colors_rgba = _colors_to_float_rgba(color_arr)
+            assert len(colors_rgba) == num_points
+            if num_points > _image_capacity(image):
+                _resize_uv_color_image(image, num_points, list(divide_nodes))
+            _write_color_image(image, colors_rgba)
+
+    logger.info(
+        "Updated instancer '{}' from {} to {} points.".format(
+            obj_instancer.name, num_points_old, num_points
+        )
+    )
+    return obj_instancer
+
+
 def read_verts(mesh):
     mverts_co = np.zeros((len(mesh.vertices) * 3), dtype=np.float32)
     mesh.vertices.foreach_get("co", mverts_co)
     return np.reshape(mverts_co, (len(mesh.vertices), 3))
 
 
-def apply_trafo(points, trafo):
-    return np.matmul(trafo, points.T).T
-
-
 # adapted from https://blender.stackexchange.com/a/80592
 def bmesh_join(list_of_bmeshes, list_of_matrices, *, normal_update=False, bmesh):
     """takes as input a list of bm references and outputs a single merged bmesh
@@ -431,16 +1344,128 @@ def bmesh_join(list_of_bmeshes, list_of_matrices, *, normal_update=False, bmesh)
     return bm
 
 
-def simple_scale_matrix(factor: np.array, direction: np.array):
-    dir_len = np.sqrt(np.sum(direction**2))
-    assert dir_len > 0.0, "direction vector of scale matrix may not have length zero"
-    normalized_dir = direction / dir_len
-    factor = 1.0 - factor
-    scale_matrix = np.eye(4)
-    scale_matrix[:3, :3] -= factor * np.einsum(
-        "i,j->ij", normalized_dir.ravel(), normalized_dir.ravel()
+def flow_arrow_rotations(flow: np.ndarray) -> np.ndarray:
+    """[N, 3, 3] rotations that map the +z axis onto the direction of each flow vector.
+
+    Batched Rodrigues formula. Zero-length flow vectors map to the identity.
+    """
+    flow_len = np.linalg.norm(flow, axis=-1)
+    flow_unit = flow / np.maximum(flow_len, np.finfo(np.float32).tiny)[:, None]
+
+    # v = cross(z, u), cosine = dot(z, u)
+    vx = np.zeros(flow.shape[:1] + (3, 3), dtype=np.float32)
+    vx[:, 0, 2] = flow_unit[:, 0]
+    vx[:, 1, 2] = flow_unit[:, 1]
+    vx[:, 2, 0] = -flow_unit[:, 0]
+    vx[:, 2, 1] = -flow_unit[:, 1]
+    one_plus_cosine = 1.0 + flow_unit[:, 2]
+
+    # (almost) anti-parallel to z: rotate by pi around the x-axis instead
+    antiparallel = one_plus_cosine < 1e-6
+    with np.errstate(divide="ignore"):
+        factor = np.where(antiparallel, 0.0, 1.0 / one_plus_cosine)
+
+    rotations = np.einsum("nij,njk->nik", vx, vx)
+    rotations *= factor[:, None, None].astype(np.float32)
+    rotations += vx
+    rotations += np.eye(3, dtype=np.float32)
+    rotations[antiparallel] = np.diag(np.array([1.0, -1.0, -1.0], dtype=np.float32))
+    return rotations
+
+
+def flow_arrow_quaternions(flow: np.ndarray) -> np.ndarray:
+    """[N, 4] (w, x, y, z) quaternions of the rotations of `flow_arrow_rotations`."""
+    flow_len = np.linalg.norm(flow, axis=-1)
+    flow_unit = flow / np.maximum(flow_len, np.finfo(np.float32).tiny)[:, None]
+
+    # half-way quaternion (1 + cosine, cross(z, u)), normalized
+    quaternions = np.zeros(flow.shape[:1] + (4,), dtype=np.float32)
+    quaternions[:, 0] = 1.0 + flow_unit[:, 2]
+    quaternions[:, 1] = -flow_unit[:, 1]
+    quaternions[:, 2] = flow_unit[:, 0]
+
+    # (almost) anti-parallel to z: rotate by pi around the x-axis instead
+    antiparallel = quaternions[:, 0] < 1e-6
+    quaternions[antiparallel] = (0.0, 1.0, 0.0, 0.0)
+
+    quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    return quaternions
+
+
+def transform_flow_arrows(
+    arrow_vertices: np.ndarray, point_cloud: np.ndarray, flow: np.ndarray
+) -> np.ndarray:
+    """Place a +z aligned unit arrow at every point.
+
+    Each arrow is scaled along z by the flow magnitude, rotated onto the flow
+    direction and translated to its point.
+
+    :param arrow_vertices: [V, 3] vertices of the unit arrow
+    :param point_cloud: [N, 3] arrow origins
+    :param flow: [N, 3] flow vectors
+    :return: [N, V, 3] float32 vertices
+    """
+    arrow_vertices = arrow_vertices.astype(np.float32, copy=False)
+    point_cloud = point_cloud.astype(np.float32, copy=False)
+    flow = flow.astype(np.float32, copy=False)
+
+    trafos = flow_arrow_rotations(flow)
+    # fold the scale along the arrow axis into the rotation: R @ diag(1, 1, |f|)
+    trafos[:, :, 2] *= np.linalg.norm(flow, axis=-1)[:, None]
+
+    vertices = np.einsum("nij,vj->nvi", trafos, arrow_vertices)
+    vertices += point_cloud[:, None, :]
+    return vertices
+
+
+def _add_flow_instances(
+    *,
+    point_cloud: np.ndarray,
+    flow: np.ndarray,
+    colors_rgba: np.ndarray,
+    arrow_mesh,
+    name_prefix: str,
+    scene,
+):
+    """Instance `arrow_mesh` (unit length along +z) once per flow vector."""
+    assert point_cloud.shape == flow.shape
+
+    obj_arrow = bpy.data.objects.new("obj_{}_arrow".format(name_prefix), arrow_mesh)
+    if scene is not None:
+        scene.collection.objects.link(obj_arrow)
+
+    obj = _create_geometry_nodes_instancer_obj(
+        point_cloud,
+        "obj_{}".format(name_prefix),
+        "mesh_{}_points".format(name_prefix),
+        obj_arrow,
+        rotation_attribute="rotation",
+        scale_attribute="scale",
+    )
+    # the prototype is only referenced by the node tree
+    obj_arrow.hide_render = True
+    obj_arrow.hide_viewport = True
+
+    mesh = obj.data
+    rotation = mesh.attributes.new(name="rotation", type="QUATERNION", domain="POINT")
+    rotation.data.foreach_set("value", flow_arrow_quaternions(flow).reshape(-1))
+
+    scale = np.ones_like(flow)
+    scale[:, 2] = np.linalg.norm(flow, axis=-1)
+    attr_scale = mesh.attributes.new(name="scale", type="FLOAT_VECTOR", domain="POINT")
+    attr_scale.data.foreach_set("vector", scale.reshape(-1))
+
+    _create_color_attribute(mesh, colors_rgba, "color_flow")
+
+    material = create_flow_material(
+        "material_{}".format(name_prefix), attribute_type="INSTANCER", shared=True
     )
-    return scale_matrix
+    obj_arrow.data.materials.append(material)
+
+    if scene is not None:
+        scene.collection.objects.link(obj)
+
+    return obj
 
 
 def add_flow_mesh(
@@ -454,7 +1479,27 @@ def add_flow_mesh(
     arrow_head_height: float = 0.2,
     arrow_head_diameter: float = 0.15,
     scene,
+    mode: str = "mesh",
+    cull: str = None,
+    color_wheel: str = "hsv",
 ):
+    """
+
+    :param point_cloud: [N, 3] arrow origins
+    :param flow: [N, 3] flow vectors
+    :param colors_rgba: [N, 4] float32 arrow colors, default: colors of the flow
+        directions and magnitudes (see `flow_colors.flow_colors`)
+    :param mode: 'mesh' bakes all arrows into a single mesh. 'instances' instances
+        one arrow mesh per point with per-instance rotation, scale and color.
+    :param cull: One of culling.CULL_MODES to drop arrows that are not visible in
+        any camera of the scene
+    :param color_wheel: One of flow_colors.FLOW_COLOR_WHEELS, used without
+        colors_rgba
+    :return:
+    """
+    if mode not in FLOW_MODES:
+        raise ValueError("Unknown flow mode '{}'.".format(mode))
+
     if point_cloud.dtype != np.float32:
         print(
             "Warning: dtype of point_cloud should be np.float32. Casting to np.float32"
@@ -465,12 +1510,31 @@ def add_flow_mesh(
         print("Warning: dtype of flow should be np.float32. Casting to np.float32")
         flow = flow.astype(np.float32)
 
-    if colors_rgba.dtype != np.float32:
+    if colors_rgba is None:
+        colors_rgba = flow_colors(flow, color_wheel=color_wheel)
+    elif colors_rgba.dtype != np.float32:
         print(
             "Warning: dtype of colors_rgba should be np.float32. Casting to np.float32"
         )
         colors_rgba = colors_rgba.astype(np.float32)
 
+    if cull is not None:
+        # bounding sphere of the arrows, which span [0, arrow_length] * |flow|
+        arrow_length = max(
+            0.5 + 0.5 * arrow_shaft_length, 1.0 + 0.5 * arrow_head_height
+        )
+        half_length = 0.5 * arrow_length * np.linalg.norm(flow, axis=-1)
+        visible = visible_mask(
+            scene,
+            point_cloud + 0.5 * arrow_length * flow,
+            radius=half_length + 0.5 * max(arrow_head_diameter, arrow_shaft_diameter),
+            mode=cull,
+            occluder_radius=0.5 * arrow_shaft_diameter,
+        )
+        point_cloud = point_cloud[visible]
+        flow = flow[visible]
+        colors_rgba = colors_rgba[visible]
+
     # arrow shaft
     arrow_shaft = bmesh.new()
     bmesh.ops.create_cone(
@@ -517,15 +1581,23 @@ def add_flow_mesh(
     arrow_shaft.free()
     arrow_mesh.free()
 
+    if mode == "instances":
+        return _add_flow_instances(
+            point_cloud=point_cloud,
+            flow=flow,
+            colors_rgba=colors_rgba,
+            arrow_mesh=me,
+            name_prefix=name_prefix,
+            scene=scene,
+        )
+
     polygons = me.polygons
     npolygons = len(polygons)
     nloops = len(me.loops)
 
     startloop = np.empty(npolygons, dtype=np.int32)
     loop_total = np.empty(npolygons, dtype=np.int32)
-    polygon_indices = np.empty(npolygons, dtype=np.int32)
 
-    polygons.foreach_get("index", polygon_indices)
     polygons.foreach_get("loop_start", startloop)
     polygons.foreach_get("loop_total", loop_total)
 
@@ -535,58 +1607,19 @@ def add_flow_mesh(
     mesh_verts = read_verts(me)
 
     num_flow_vecs = flow.shape[0]
-    flow_len = np.linalg.norm(flow, axis=-1)
-
-    vertices_homog = np.concatenate(
-        [mesh_verts, np.ones((mesh_verts.shape[0], 1))], axis=-1
-    )
-
-    full_vertices = []
-    vertex_indices = []
-    loop_start = []
-    loop_total = np.tile(loop_total, num_flow_vecs)
+    num_verts = len(mesh_verts)
 
     assert point_cloud.shape == flow.shape
-    for flow_vec_idx in range(num_flow_vecs):
-        arrow_head_unit = np.array([0.0, 0.0, 1.0])
-        scale_mat = simple_scale_matrix(
-            flow_len[flow_vec_idx], np.array([0.0, 0.0, 1.0])
-        )
-        vert_scaled = apply_trafo(np.copy(vertices_homog), scale_mat)
-
-        flow_vec = flow[flow_vec_idx]
-
-        flow_vec_unit = flow_vec / np.sqrt(np.sum(flow_vec**2))
+    # [N, V, 3] vertices of all arrows in one pass
+    full_vertices = transform_flow_arrows(mesh_verts, point_cloud, flow)
+    full_vertices = full_vertices.reshape((-1, 3))
 
-        # rotation matrix R that rotates unit vector a onto unit vector b.
-        v = np.cross(arrow_head_unit, flow_vec_unit)
-        cosine = np.dot(arrow_head_unit, flow_vec_unit)
-
-        vx = np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
-        R = np.eye(3) + vx + np.dot(vx, vx) * 1.0 / (1.0 + cosine)
-        T_rot = np.eye(4)
-        T_rot[0:3, 0:3] = R
-        vert_rotated = apply_trafo(vert_scaled, T_rot)
-
-        translation_matrix = np.eye(4)
-        translation_matrix[:3, 3] = point_cloud[flow_vec_idx][:3]
-
-        vert_translated = apply_trafo(vert_rotated, translation_matrix)
-
-        vert_final = vert_translated[..., 0:3]
-
-        full_vertices.append(vert_final)
-        shifted_start = startloop + flow_vec_idx * nloops
-        loop_start.append(shifted_start)
-        shifted_vertex_indices = vertex_index + flow_vec_idx * len(mesh_verts)
-        vertex_indices.append(shifted_vertex_indices)
-
-    vertex_indices = np.concatenate(vertex_indices, axis=0)
-
-    full_vertices = np.concatenate(full_vertices, axis=0)
-    loop_start = np.concatenate(loop_start, axis=0)
+    arrow_offsets = np.arange(num_flow_vecs, dtype=np.int32)[:, None]
+    vertex_indices = (vertex_index[None, :] + arrow_offsets * num_verts).reshape(-1)
+    loop_start = (startloop[None, :] + arrow_offsets * nloops).reshape(-1)
+    loop_total = np.tile(loop_total, num_flow_vecs)
 
-    assert sum(loop_total) == len(vertex_indices)
+    assert loop_total.sum() == len(vertex_indices)
     assert loop_total.shape == loop_start.shape
 
     assert npolygons * num_flow_vecs == len(loop_start)
@@ -595,38 +1628,36 @@ def add_flow_mesh(
     assert np.all(np.diff(loop_start) == loop_total[:-1])
 
     mesh = bpy.data.meshes.new(name="flow_mesh")
-    # vertices
+    # vertices. The generic attribute API is much faster than 'co'/'vertex_index'
+    # of mesh.vertices/mesh.loops for millions of elements.
     mesh.vertices.add(full_vertices.shape[0])
-    mesh.vertices.foreach_set("co", full_vertices.astype(np.float32).reshape((-1)))
+    mesh.attributes["position"].data.foreach_set("vector", full_vertices.reshape(-1))
 
     # vertex indices
     mesh.loops.add(vertex_indices.shape[0])
-    mesh.loops.foreach_set("vertex_index", vertex_indices)
+    mesh.attributes[".corner_vert"].data.foreach_set("value", vertex_indices)
 
     # triangles
     mesh.polygons.add(loop_start.shape[0])
     mesh.polygons.foreach_set("loop_start", loop_start)
     mesh.polygons.foreach_set("loop_total", loop_total)
 
-    colors_per_vertex_index_colors_rgba = np.tile(
-        colors_rgba[:, None, :], reps=[1, len(mesh_verts), 1]
-    )
-    colors_flattened = np.reshape(colors_per_vertex_index_colors_rgba, (-1, 4))
-
-    colors_per_vertex_index = colors_flattened[vertex_indices]
+    # every loop of an arrow has the color of its flow vector
+    colors_per_loop = np.repeat(colors_rgba, nloops, axis=0)
     # Create vertex color layer and set values
     vcol_lay = mesh.vertex_colors.new(name="color_flow")
-    color_verts = np.reshape(colors_per_vertex_index, (-1))
+    color_verts = np.reshape(colors_per_loop, (-1))
     vcol_lay.data.foreach_set("color", color_verts)
 
     vcol_grad = mesh.vertex_colors.new(name="color_grads")
     vcol_grad.data.foreach_set("color", color_verts)
 
+    # no mesh.validate(): the topology is replicated from the valid arrow mesh and
+    # validating millions of loops dominates the run time for dense flow.
     mesh.update()
-    mesh.validate()
 
     obj = bpy.data.objects.new("obj_{}".format(name_prefix), mesh)
-    material = create_flow_material("material_{}".format(name_prefix))
+    material = create_flow_material("material_{}".format(name_prefix), shared=True)
     obj.data.materials.append(material)
 
     # baurst: very unsure about this
@@ -636,42 +1667,86 @@ def add_flow_mesh(
     return obj
 
 
-def create_cube_with_wireframe(
-    position: np.ndarray,
-    scale: np.ndarray,
-    rotation: np.ndarray,
-    wireframe_scale: float,
-    color: np.ndarray,
-):
-    # create a mesh cube
-    bpy.ops.object.select_all(action="DESELECT")
-    bpy.ops.mesh.primitive_cube_add(
-        size=1, enter_editmode=False, align="WORLD", location=position
-    )
-    cube = bpy.context.object
-
-    # set scale and rotation
-    cube.scale = scale
-    cube.rotation_euler = rotation
-    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
-
-    # add wireframe modifier
-    bpy.ops.object.modifier_add(type="WIREFRAME")
-    wireframe_modifier = cube.modifiers[-1]
-    wireframe_modifier.thickness = wireframe_scale
-
-    # create a new material with the given color
-    material = bpy.data.materials.new(name="CubeMaterial")
-    material.use_nodes = False
-    material.diffuse_color = color
-
-    # assign the material to the cube
-    if len(cube.data.materials) > 0:
-        cube.data.materials[0] = material
-    else:
-        cube.data.materials.append(material)
+# corners of the unit cube centered at the origin, bottom face first
+_BOX_UNIT_CORNERS = np.array(
+    [
+        [-0.5, -0.5, -0.5],
+        [0.5, -0.5, -0.5],
+        [0.5, 0.5, -0.5],
+        [-0.5, 0.5, -0.5],
+        [-0.5, -0.5, 0.5],
+        [0.5, -0.5, 0.5],
+        [0.5, 0.5, 0.5],
+        [-0.5, 0.5, 0.5],
+    ],
+    dtype=np.float32,
+)
+# outward facing quads (bottom, top, front, right, back, left)
+_BOX_FACES = np.array(
+    [
+        [0, 3, 2, 1],
+        [4, 5, 6, 7],
+        [0, 1, 5, 4],
+        [1, 2, 6, 5],
+        [2, 3, 7, 6],
+        [3, 0, 4, 7],
+    ],
+    dtype=np.int32,
+)
+
+
+def box_corners(positions: np.ndarray, dims: np.ndarray, yaw: np.ndarray):
+    """[N, 8, 3] float32 corners of boxes with yaw rotation.
+
+    :param positions: [N, 3] box centers
+    :param dims: [N, 3] box size length, width, height
+    :param yaw: [N] or [N, 1] rotation angle around the z-axis
+    """
+    positions = np.asarray(positions, dtype=np.float32)
+    dims = np.asarray(dims, dtype=np.float32)
+    yaw = np.asarray(yaw, dtype=np.float32).reshape(-1)
+
+    corners = _BOX_UNIT_CORNERS[None, :, :] * dims[:, None, :]
+    cos_yaw = np.cos(yaw)[:, None]
+    sin_yaw = np.sin(yaw)[:, None]
+    x = cos_yaw * corners[..., 0] - sin_yaw * corners[..., 1]
+    y = sin_yaw * corners[..., 0] + cos_yaw * corners[..., 1]
+    corners[..., 0] = x
+    corners[..., 1] = y
+    corners += positions[:, None, :]
+    return corners
+
+
+def _create_boxes_mesh(corners: np.ndarray, colors_rgba: np.ndarray, name: str):
+    """Single mesh of closed boxes with a point color attribute 'box_color'."""
+    num_boxes = corners.shape[0]
+    if name in bpy.data.meshes:
+        raise RuntimeError("Mesh '{}' already exists.".format(name))
+    mesh = bpy.data.meshes.new(name=name)
+
+    mesh.vertices.add(num_boxes * 8)
+    mesh.vertices.foreach_set("co", corners.reshape((-1)))
 
-    return cube
+    vertex_offsets = 8 * np.arange(num_boxes, dtype=np.int32)[:, None, None]
+    vertex_indices = (_BOX_FACES[None, :, :] + vertex_offsets).reshape((-1))
+    mesh.loops.add(len(vertex_indices))
+    mesh.loops.foreach_set("vertex_index", vertex_indices)
+
+    num_faces = num_boxes * len(_BOX_FACES)
+    mesh.polygons.add(num_faces)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, 4 * num_faces, 4, np.int32))
+    mesh.polygons.foreach_set("loop_total", np.full(num_faces, 4, np.int32))
+
+    # every box has its own vertices, point colors are constant per box
+    colors = np.repeat(colors_rgba.astype(np.float32), 8, axis=0)
+    attribute = mesh.attributes.new(
+        name="box_color", type="FLOAT_COLOR", domain="POINT"
+    )
+    attribute.data.foreach_set("color", colors.reshape((-1)))
+
+    mesh.update()
+    mesh.validate()
+    return mesh
 
 
 def add_boxes(
@@ -682,10 +1757,14 @@ def add_boxes(
     confidence_threshold: float = 0.0,
     bounding_box_wire_frame_scale: float = 0.2,
     verbose: bool = False,
+    name_prefix: str = "boxes",
 ):
     """
     supports only boxes with yaw rotation
 
+    All boxes are created as a single mesh with a wireframe modifier and one shared
+    material. Box colors are stored in the point color attribute 'box_color'.
+
     scene: blender py scene
     boxes: dictionairy with
         * 'pos': np.ndarray with shape [num_boxes, 3] (i.e. box positions in 3d)
@@ -695,40 +1774,58 @@ def add_boxes(
     box_colors_rgba_f64: np.ndarray with shape [num_boxes, 4], i.e. a color for each box
     confidence_threshold: boxes below this threshold are discarded
     bounding_box_wire_frame_scale: this is the thickness of the box wireframe (in meters I think)
+    name_prefix: prefix of the created mesh, object and material
     """
 
     assert "pos" in boxes, "need box positions with key 'pos' to work!"
     assert "dims" in boxes, "need box dimensions with key 'dims' to work!"
     assert "rot" in boxes, "need box rotations (yaw angle) with key 'rot' to work!"
 
-    assert (box_colors_rgba_f64 <= 1.0).all(), (
-        "this code is only tested with f64 colors <= 1.0!"
-    )
+    assert (
+        box_colors_rgba_f64 <= 1.0
+    ).all(), "this code is only tested with f64 colors <= 1.0!"
 
     num_boxes = boxes["pos"].shape[0]
-    for box_idx in range(num_boxes):
-        box_confidence = np.squeeze(boxes["probs"][box_idx])
-        if box_confidence < confidence_threshold:
-            if verbose:
-                print(f"Discarding box #{box_idx} with confidence {box_confidence}")
-            continue
-        if verbose:
+    if "probs" in boxes:
+        box_confidence = np.asarray(boxes["probs"]).reshape((num_boxes,))
+    else:
+        box_confidence = np.ones((num_boxes,))
+    keep = box_confidence >= confidence_threshold
+
+    if verbose:
+        for box_idx in range(num_boxes):
+            if not keep[box_idx]:
+                print(
+                    f"Discarding box #{box_idx} with confidence "
+                    f"{box_confidence[box_idx]}"
+                )
+                continue
             print(
                 f"Add box #{box_idx} at position: ",
                 boxes["pos"][box_idx],
                 ", rotation: ",
                 boxes["rot"][box_idx],
-                f", confidence: {box_confidence}",
+                f", confidence: {box_confidence[box_idx]}",
             )
-        cube = create_cube_with_wireframe(
-            position=boxes["pos"][box_idx],
-            scale=boxes["dims"][box_idx],
-            rotation=(
-                0.0,
-                0.0,
-                boxes["rot"][box_idx],
-            ),
-            wireframe_scale=bounding_box_wire_frame_scale,
-            color=box_colors_rgba_f64[box_idx],
-        )
-        scene.collection.objects.link(cube)
+
+    corners = box_corners(
+        boxes["pos"][keep], boxes["dims"][keep], np.asarray(boxes["rot"])[keep]
+    )
+    mesh = _create_boxes_mesh(
+        corners, box_colors_rgba_f64[keep], "{}_mesh".format(name_prefix)
+    )
+
+    obj = bpy.data.objects.new("{}_obj".format(name_prefix), mesh)
+    wireframe_modifier = obj.modifiers.new("wireframe", "WIREFRAME")
+    wireframe_modifier.thickness = bounding_box_wire_frame_scale
+
+    material, _ = create_attribute_material(
+        "box_color",
+        "{}_material".format(name_prefix),
+        attribute_type="GEOMETRY",
+        shared=True,
+    )
+    obj.data.materials.append(material)
+
+    scene.collection.objects.link(obj)
+    return obj
@@ -2,21 +2,17 @@
 """"""
 
 import pathlib
-import bpy
+import typing
 
+import bpy
 
-def clear_all():
-    bpy.ops.object.select_all(action="SELECT")
-    bpy.ops.object.delete()
+from .datablocks import is_datablock_alive, mark_shared, remove_orphan_data
 
-    master_collection = bpy.context.scene.collection
-    for c in master_collection.children:
-        master_collection.children.unlink(c)
 
-    for c in bpy.data.collections:
-        for o in c.objects:
-            bpy.data.objects.remove(o)
-        bpy.data.collections.remove(c)
+def clear_all():
+    """Remove all objects and collections and the data only they used."""
+    bpy.data.batch_remove(list(bpy.data.objects) + list(bpy.data.collections))
+    remove_orphan_data()
 
 
 def add_light_source(scene):
@@ -55,15 +51,65 @@ def add_light_source(scene):
     world.light_settings.use_ambient_occlusion = True
 
 
-def create_world_with_hdr_background(name: str = "world_hdr"):
-    hdr_filepath = (
-        pathlib.Path(__file__).parent.parent / "assets" / "ruckenkreuz_2k.hdr"
-    )
+DEFAULT_HDR_FILEPATH = (
+    pathlib.Path(__file__).parent.parent / "assets" / "ruckenkreuz_2k.hdr"
+)
+
+# HDR worlds per (resolved HDR path, strength) and their environment images per
+# resolved HDR path, shared by all scenes
+_hdr_worlds = {}
+_hdr_images = {}
+
+
+def clear_hdr_world_cache(remove: bool = False):
+    """Forget all memoized HDR worlds and images, e.g. after the files changed.
+
+    :param remove: Also remove the worlds and images from bpy.data
+    """
+    if remove:
+        datablocks = [
+            d
+            for d in list(_hdr_worlds.values()) + list(_hdr_images.values())
+            if is_datablock_alive(d)
+        ]
+        bpy.data.batch_remove(datablocks)
+    _hdr_worlds.clear()
+    _hdr_images.clear()
+
+
+def _load_hdr_image(hdr_filepath: pathlib.Path):
+    image = _hdr_images.get(hdr_filepath)
+    if image is None or not is_datablock_alive(image):
+        image = bpy.data.images.load(str(hdr_filepath), check_existing=False)
+        _hdr_images[hdr_filepath] = image
+        mark_shared(image)
+    return image
+
+
+def create_world_with_hdr_background(
+    name: str = "world_hdr",
+    hdr_filepath: typing.Union[str, pathlib.Path, None] = None,
+    strength: float = 1.0,
+):
+    """World lit by an HDR environment image.
+
+    Worlds are memoized per (HDR file, strength) and shared between scenes, see
+    `clear_hdr_world_cache`. `name` is only used when a new world is created.
+    """
+    if hdr_filepath is None:
+        hdr_filepath = DEFAULT_HDR_FILEPATH
+    hdr_filepath = pathlib.Path(hdr_filepath).resolve()
+
+    key = (hdr_filepath, float(strength))
+    world = _hdr_worlds.get(key)
+    if world is not None and is_datablock_alive(world):
+        return world
+
     if not hdr_filepath.is_file():
         raise FileNotFoundError(
             "Cannot find HDR background file {}".format(str(hdr_filepath))
         )
-    background_image = bpy.data.images.load(str(hdr_filepath), check_existing=False)
+    background_image = _load_hdr_image(hdr_filepath)
 
     world = bpy.data.worlds.new(name)
     world.use_nodes = True
@@ -75,6 +121,7 @@ def create_world_with_hdr_background(name: str = "world_hdr"):
     node_tex_env.image = background_image
 
     node_background = nodes.new(type="ShaderNodeBackground")
+    node_background.inputs["Strength"].default_value = strength
     node_background.location = 300, 0
 
     node_output = nodes.new(type="ShaderNodeOutputWorld")
@@ -84,6 +131,9 @@ def create_world_with_hdr_background(name: str = "world_hdr"):
     links = world.node_tree.links
     links.new(node_tex_env.outputs[0], node_background.inputs[0])
     links.new(node_background.outputs[0], node_output.inputs[0])
+
+    _hdr_worlds[key] = world
+    mark_shared(world)
     return world
 
 
@@ -133,7 +183,11 @@ def add_cameras_default(scene):
     return cam_main, cam_top
 
 
-def setup_scene(name: str = "blender_kitti", use_background_image: bool = True):
+def setup_scene(
+    name: str = "blender_kitti",
+    use_background_image: bool = True,
+    hdr_strength: float = 1.0,
+):
     scene = bpy.data.scenes.new(name)
     scene.render.engine = "CYCLES"
     scene.render.film_transparent = True
@@ -142,7 +196,7 @@ def setup_scene(name: str = "blender_kitti", use_background_image: bool = True):
     scene.view_settings.view_transform = "Standard"
 
     if use_background_image:
-        scene.world = create_world_with_hdr_background()
+        scene.world = create_world_with_hdr_background(strength=hdr_strength)
     else:
         add_light_source(scene)
     return scene
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Semantic label colors from lookup tables (SemanticKITTI config format)."""
+
+import pathlib
+import typing
+
+import numpy as np
+from ruamel.yaml import YAML
+
+# semantic labels are the lower 16 bits of the KITTI point labels
+NUM_LABELS = 1 << 16
+
+# memoized colorizers of config files
+_colorizers = {}
+
+
+def load_semantic_kitti_config(filepath) -> dict:
+    """Read a 'semantic-kitti.yaml' style config into plain dicts."""
+    filepath = pathlib.Path(filepath)
+    if not filepath.is_file():
+        raise FileNotFoundError(
+            "Cannot find semantic config file '{}'.".format(filepath)
+        )
+    with open(str(filepath), "r") as file_config:
+        yaml = YAML(typ="safe")
+        data = yaml.load(file_config)
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in data.items()}
+
+
+def _semantic_labels(labels: np.ndarray) -> np.ndarray:
+    labels = np.asarray(labels)
+    if labels.dtype.itemsize > 2:
+        # drop the instance id in the upper half
+        return labels & 0xFFFF
+    return labels.astype(np.uint16, copy=False)
+
+
+class SemanticColorizer:
+    """Maps semantic labels to uint8 RGB colors with a single fancy-index.
+
+    The dense lookup tables (one entry for each of the 2^16 labels) are built
+    once, calls only index them, e.g. colors = colorizer(labels). The colors can
+    be passed to `add_point_cloud` or `add_voxels` directly.
+    """
+
+    def __init__(
+        self,
+        color_map: typing.Dict[int, typing.Sequence[int]],
+        learning_map: typing.Union[typing.Dict[int, int], None] = None,
+        learning_map_inv: typing.Union[typing.Dict[int, int], None] = None,
+        bgr: bool = True,
+        unknown_color: typing.Sequence[int] = (0, 0, 0),
+    ):
+        """
+
+        :param color_map: Color of every label
+        :param learning_map: If given, labels are mapped to their training class
+            first and colored like the label of that class in `learning_map_inv`
+            (e.g. 'moving-car' like 'car')
+        :param bgr: Colors of `color_map` are BGR (SemanticKITTI)
+        :param unknown_color: RGB color of labels missing in the maps
+        """
+        color_lut = np.empty((NUM_LABELS, 3), dtype=np.uint8)
+        color_lut[:] = unknown_color
+        labels = np.fromiter(color_map.keys(), dtype=np.int64, count=len(color_map))
+        colors = np.asarray(list(color_map.values()), dtype=np.uint8).reshape((-1, 3))
+        color_lut[labels] = colors[:, ::-1] if bgr else colors
+
+        self.class_lut = None
+        if learning_map is not None:
+            if learning_map_inv is None:
+                raise ValueError("Need learning_map_inv to color training classes.")
+            self.class_lut = np.zeros(NUM_LABELS, dtype=np.uint8)
+            self.class_lut[list(learning_map.keys())] = list(learning_map.values())
+
+            class_colors = np.empty((max(learning_map_inv.keys()) + 1, 3), np.uint8)
+            class_colors[:] = unknown_color
+            for class_id, label in learning_map_inv.items():
+                class_colors[class_id] = color_lut[label]
+            known = np.zeros(NUM_LABELS, dtype=bool)
+            known[list(learning_map.keys())] = True
+            color_lut[known] = class_colors[self.class_lut[known]]
+
+        self.color_lut = color_lut
+
+    @classmethod
+    def from_config(cls, config: dict, use_learning_map: bool = False, **kwargs):
+        """
+
+        :param config: SemanticKITTI config, see `load_semantic_kitti_config`
+        :param use_learning_map: Color the training classes
+        """
+        if use_learning_map:
+            kwargs.update(
+                learning_map=config["learning_map"],
+                learning_map_inv=config["learning_map_inv"],
+            )
+        return cls(config["color_map"], **kwargs)
+
+    def __call__(self, labels: np.ndarray) -> np.ndarray:
+        """
+
+        :param labels: Labels of any shape, uint32 KITTI labels are reduced to
+            their semantic part
+        :return: uint8 RGB colors, shape of labels + (3,)
+        """
+        return self.color_lut[_semantic_labels(labels)]
+
+    def classes(self, labels: np.ndarray) -> np.ndarray:
+        """Training class of every label (needs a learning_map)."""
+        if self.class_lut is None:
+            raise RuntimeError("Colorizer has no learning_map.")
+        return self.class_lut[_semantic_labels(labels)]
+
+
+def get_semantic_colorizer(
+    config_filepath, use_learning_map: bool = False
+) -> SemanticColorizer:
+    """Colorizer of a config file, built once and reused (e.g. for all frames)."""
+    key = (str(pathlib.Path(config_filepath).resolve()), use_learning_map)
+    if key not in _colorizers:
+        _colorizers[key] = SemanticColorizer.from_config(
+            load_semantic_kitti_config(config_filepath), use_learning_map
+        )
+    return _colorizers[key]
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Surface extraction of voxel grids.
+
+Only faces between an occupied and a free cell are kept. Optionally, coplanar
+faces of equal color are merged into larger quads. Everything is plain NumPy.
+"""
+
+import typing
+
+import numpy as np
+
+
+def _label_grid(voxels: np.ndarray, colors: typing.Union[np.ndarray, None]):
+    """Per-cell integer color label (-1 for free cells) and the label colors."""
+    labels = np.full(voxels.shape, -1, dtype=np.int64)
+    if colors is None:
+        labels[voxels] = 0
+        return labels, None
+
+    unique_colors, inverse = np.unique(colors[voxels], axis=0, return_inverse=True)
+    labels[voxels] = inverse.reshape(-1)
+    return labels, unique_colors
+
+
+def _exposed_faces(voxels: np.ndarray, axis: int, direction: int) -> np.ndarray:
+    """Occupied cells whose neighbor in `direction` along `axis` is free."""
+    padding = [(0, 0)] * 3
+    padding[axis] = (1, 1)
+    padded = np.pad(voxels, padding, constant_values=False)
+    neighbor = np.take(
+        padded, np.arange(1 + direction, voxels.shape[axis] + 1 + direction), axis
+    )
+    return voxels & ~neighbor
+
+
+def _merge_runs(faces: np.ndarray, labels: np.ndarray):
+    """Merge consecutive faces of equal label along the last axis.
+
+    :param faces: [..., U] boolean face mask
+    :param labels: [..., U] color label per face
+    :return: flat row index, start and length along U, label of every run
+    """
+    num_u = faces.shape[-1]
+    faces = faces.reshape((-1, num_u))
+    labels = labels.reshape((-1, num_u))
+
+    continues = np.zeros_like(faces)
+    continues[:, 1:] = faces[:, 1:] & faces[:, :-1] & (labels[:, 1:] == labels[:, :-1])
+    starts = faces & ~continues
+    ends = faces.copy()
+    ends[:, :-1] &= ~continues[:, 1:]
+
+    row, u_start = np.nonzero(starts)
+    _, u_end = np.nonzero(ends)
+    return row, u_start, u_end - u_start + 1, labels[row, u_start]
+
+
+def _greedy_quads(faces: np.ndarray, labels: np.ndarray):
+    """Rectangles covering a stack of 2D face masks.
+
+    Runs along the last axis are merged first, then identical runs (same start,
+    length and label) in consecutive rows of the same slice.
+
+    :param faces: [W, V, U] boolean face mask
+    :param labels: [W, V, U] color label per face
+    :return: [Q, 6] int array (w, v_start, u_start, v_len, u_len, label)
+    """
+    num_v = faces.shape[1]
+    row, u_start, u_len, label = _merge_runs(faces, labels)
+    w, v = np.divmod(row, num_v)
+
+    # sort such that mergeable runs are adjacent and ordered by v
+    order = np.lexsort((v, label, u_len, u_start, w))
+    w, v, u_start, u_len, label = (x[order] for x in (w, v, u_start, u_len, label))
+
+    same_run = np.zeros(len(w), dtype=bool)
+    same_run[1:] = (
+        (w[1:] == w[:-1])
+        & (u_start[1:] == u_start[:-1])
+        & (u_len[1:] == u_len[:-1])
+        & (label[1:] == label[:-1])
+        & (v[1:] == v[:-1] + 1)
+    )
+    first = np.flatnonzero(~same_run)
+    last = np.append(first[1:], len(w)) - 1
+    v_len = v[last] - v[first] + 1
+
+    return np.stack(
+        (w[first], v[first], u_start[first], v_len, u_len[first], label[first]),
+        axis=-1,
+    )
+
+
+def _unit_quads(faces: np.ndarray, labels: np.ndarray):
+    """One quad per face, same layout as `_greedy_quads`."""
+    w, v, u = np.nonzero(faces)
+    ones = np.ones_like(w)
+    return np.stack((w, v, u, ones, ones, labels[w, v, u]), axis=-1)
+
+
+def voxel_surface_quads(
+    voxels: np.ndarray,
+    colors: np.ndarray = None,
+    *,
+    voxel_size: typing.Union[float, np.ndarray] = 0.2,
+    origin: np.ndarray = None,
+    greedy: bool = False,
+):
+    """Exposed faces of a voxel grid as quads.
+
+    Voxel (i, j, k) is centered at origin + (i, j, k) * voxel_size, i.e. at the same
+    position as the particles of `add_voxels`.
+
+    :param voxels: [X, Y, Z] boolean occupancy
+    :param colors: [X, Y, Z, C] per-voxel colors, optional
+    :param voxel_size: Scalar or per-axis voxel edge length
+    :param origin: Position of voxel (0, 0, 0)
+    :param greedy: Merge coplanar faces of equal color into larger quads
+    :return: vertices [4 * Q, 3] float32, quads [Q, 4] int32 (counter-clockwise seen
+        from outside) and quad colors [Q, C] (None without colors)
+    """
+    assert voxels.ndim == 3
+    assert voxels.dtype == bool
+    voxel_size = np.broadcast_to(np.asarray(voxel_size, dtype=np.float32), (3,))
+    if origin is None:
+        origin = np.zeros((3,), dtype=np.float32)
+    origin = np.asarray(origin, dtype=np.float32)
+
+    labels, label_colors = _label_grid(voxels, colors)
+    make_quads = _greedy_quads if greedy else _unit_quads
+
+    corners = []
+    quad_labels = []
+    for axis in range(3):
+        # in-plane axes such that (axis, axis_v, axis_u) is cyclic
+        axis_v, axis_u = (axis + 1) % 3, (axis + 2) % 3
+        for direction in (-1, 1):
+            faces = _exposed_faces(voxels, axis, direction)
+            # [W, V, U] with W along the face normal
+            faces = np.transpose(faces, (axis, axis_v, axis_u))
+            face_labels = np.transpose(labels, (axis, axis_v, axis_u))
+            quads = make_quads(faces, face_labels)
+            if len(quads) == 0:
+                continue
+
+            w, v0, u0, v_len, u_len, label = quads.T
+            plane = w + 0.5 * direction
+            v = (v0 - 0.5, v0 + v_len - 0.5)
+            u = (u0 - 0.5, u0 + u_len - 0.5)
+            # counter-clockwise around +axis in the (v, u) plane, reversed for -axis
+            order = ((0, 0), (1, 0), (1, 1), (0, 1))
+            if direction < 0:
+                order = order[::-1]
+
+            quad_corners = np.empty((len(quads), 4, 3), dtype=np.float32)
+            for i, (iv, iu) in enumerate(order):
+                quad_corners[:, i, axis] = plane
+                quad_corners[:, i, axis_v] = v[iv]
+                quad_corners[:, i, axis_u] = u[iu]
+            corners.append(quad_corners)
+            quad_labels.append(label)
+
+    if not corners:
+        vertices = np.zeros((0, 3), dtype=np.float32)
+        quads = np.zeros((0, 4), dtype=np.int32)
+        quad_colors = None if colors is None else colors[:0, 0, 0]
+        return vertices, quads, quad_colors
+
+    corners = np.concatenate(corners, axis=0)
+    quad_labels = np.concatenate(quad_labels, axis=0)
+
+    vertices = corners.reshape((-1, 3)) * voxel_size + origin
+    quads = np.arange(len(vertices), dtype=np.int32).reshape((-1, 4))
+    quad_colors = None if label_colors is None else label_colors[quad_labels]
+    return vertices, quads, quad_colors
+
+
+def quads_to_triangles(quads: np.ndarray, quad_values: np.ndarray = None):
+    """Split [Q, 4] quads into [2 * Q, 3] triangles, repeating per-quad values."""
+    triangles = quads[:, [[0, 1, 2], [0, 2, 3]]].reshape((-1, 3))
+    if quad_values is None:
+        return triangles, None
+    return triangles, np.repeat(quad_values, 2, axis=0)
@@ -0,0 +1,66 @@
+import threading
+import unittest
+from unittest import mock
+
+from blender_kitti import blender_kitti
+from blender_kitti.blender_kitti import add_objects_from_data
+
+
+def build(scene, value):
+    return scene, 2 * value
+
+
+class TestAddObjectsFromData(unittest.TestCase):
+    def setUp(self):
+        self.prepare_threads = []
+
+        def prepare(value, **kwargs):
+            self.prepare_threads.append(threading.current_thread())
+            if value < 0:
+                raise TypeError("negative value")
+            return build, dict(kwargs, value=value)
+
+        self.patch_preparation = mock.patch.dict(
+            blender_kitti.task_preparation, {build: prepare}
+        )
+        self.patch_preparation.start()
+
+    def tearDown(self):
+        self.patch_preparation.stop()
+
+    @staticmethod
+    def make_tasks(values):
+        return {name: (build, {"value": v}) for name, v in values.items()}
+
+    def test_task_order(self):
+        values = {"c": 3, "a": 1, "b": 2, "d": 0}
+        results = [
+            add_objects_from_data(self.make_tasks(values), "scene", num_workers=n)
+            for n in (0, 2)
+        ]
+        for result in results:
+            self.assertEqual(
+                list(result.items()),
+                [
+                    ("c", ("scene", 6)),
+                    ("a", ("scene", 2)),
+                    ("b", ("scene", 4)),
+                    ("d", ("scene", 0)),
+                ],
+            )
+
+    def test_prepare_error_skips_task(self):
+        values = {"a": 1, "b": -1, "c": 3}
+        with self.assertLogs(blender_kitti.logger, "WARNING") as logs:
+            results = add_objects_from_data(
+                self.make_tasks(values), "scene", num_workers=2
+            )
+        # prepared on a worker thread, the other tasks are still built
+        self.assertNotIn(threading.main_thread(), self.prepare_threads)
+        self.assertEqual(results, {"a": ("scene", 2), "c": ("scene", 6)})
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("'b': negative value", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,236 @@
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import bpy
+import numpy as np
+
+from blender_kitti import cli, scene_setup
+
+
+def particle_datablocks(scene):
+    """Meshes and materials of the particle objects in the scene."""
+    objs = [o for o in scene.objects if o.name.endswith("_icosphere_obj")]
+    meshes = {o.data for o in objs}
+    materials = {s.material for o in objs for s in o.material_slots}
+    return meshes, materials
+
+
+class TestRenderWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = pathlib.Path(self.tmp_dir.name)
+
+        # small HDR instead of the asset file
+        image = bpy.data.images.new("test_cli_hdr", 4, 2, float_buffer=True)
+        image.filepath_raw = str(tmp_path / "world.hdr")
+        image.file_format = "HDR"
+        image.save()
+        bpy.data.images.remove(image)
+        self.patch_hdr = mock.patch.object(
+            scene_setup, "DEFAULT_HDR_FILEPATH", tmp_path / "world.hdr"
+        )
+        self.patch_hdr.start()
+
+        rng = np.random.default_rng(0)
+        self.filenames = []
+        for i in range(2):
+            filename = str(tmp_path / "frame_{}.npz".format(i))
+            np.savez(
+                filename,
+                **{
+                    "point_cloud+colored+points": rng.random((20, 3)),
+                    "point_cloud+colored+colors": np.full((20, 3), 200, np.uint8),
+                    "point_cloud+plain+points": rng.random((10, 3)),
+                },
+            )
+            self.filenames.append(filename)
+
+        self.rendered = []
+        self.patch_render = mock.patch.object(
+            cli, "render_scene", lambda scene: self.rendered.append(self.render(scene))
+        )
+        self.patch_render.start()
+
+    def tearDown(self):
+        self.patch_render.stop()
+        self.patch_hdr.stop()
+        self.tmp_dir.cleanup()
+
+    def render(self, scene):
+        return particle_datablocks(scene) + (
+            len(bpy.data.meshes),
+            len(bpy.data.materials),
+            len(bpy.data.node_groups),
+        )
+
+    def assert_datablocks_reused(self):
+        self.assertEqual(len(self.rendered), 2)
+        # nothing is rebuilt or leaked
+        self.assertEqual(self.rendered[0][2:], self.rendered[1][2:])
+        (meshes_0, materials_0, *_), (meshes_1, materials_1, *_) = self.rendered
+        self.assertEqual(len(meshes_0), 1)
+        # the second job reuses the prototype mesh and the shared material
+        self.assertEqual(meshes_0, meshes_1)
+        self.assertTrue(materials_0 & materials_1)
+        for mesh in meshes_1:
+            self.assertIn(mesh, set(bpy.data.meshes))
+
+    def test_shared_datablocks_survive_jobs(self):
+        worker = cli.RenderWorker(device="CPU")
+        worker.render([self.filenames[0]], "/tmp/test_cli_0.png")
+        worker.render([self.filenames[1]], "/tmp/test_cli_1.png")
+        bpy.data.scenes.remove(worker.scene)
+        self.assert_datablocks_reused()
+
+    def test_sequence(self):
+        output = str(pathlib.Path(self.tmp_dir.name) / "{frame:06d}_{stem}.png")
+        scene = cli.render_sequence(None, self.filenames, output, device="CPU")
+        self.assertEqual(scene.render.filepath, output.format(frame=1, stem="frame_1"))
+        bpy.data.scenes.remove(scene)
+        self.assert_datablocks_reused()
+
+
+class TestSequenceFrames(unittest.TestCase):
+    def test_skip_existing(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = str(pathlib.Path(tmp_dir) / "{frame:03d}_{stem}.png")
+            filenames = ["/data/a.npz", "/data/b.npz", "/data/c.npz"]
+            pathlib.Path(output.format(frame=1, stem="b")).touch()
+
+            frames = cli._sequence_frames(filenames, output, skip_existing=False)
+            self.assertEqual(
+                [pathlib.Path(f[1]).name for f in frames],
+                ["000_a.png", "001_b.png", "002_c.png"],
+            )
+            # frame numbers are kept when frames are skipped
+            frames = cli._sequence_frames(filenames, output, skip_existing=True)
+            self.assertEqual(
+                [(f[0], pathlib.Path(f[1]).name) for f in frames],
+                [("/data/a.npz", "000_a.png"), ("/data/c.npz", "002_c.png")],
+            )
+
+
+class StubWorker:
+    """RenderWorker that records jobs, jobs with output 'fail' raise."""
+
+    def __init__(self, *args, **kwargs):
+        self.jobs = []
+
+    def render(self, filenames, output, render_config=None):
+        if output == "fail":
+            raise RuntimeError("render failed")
+        self.jobs.append((filenames, output))
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.spool_dir = pathlib.Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def add_job(self, name, output):
+        job_path = self.spool_dir / (name + cli.JOB_SUFFIX)
+        job_path.write_text("filenames: [frame.npz]\noutput: {}\n".format(output))
+        return job_path
+
+    def spool_files(self):
+        return sorted(p.name for p in self.spool_dir.iterdir())
+
+    def test_claim(self):
+        self.assertIsNone(cli._claim_next_job(self.spool_dir))
+        self.add_job("b", "b.png")
+        self.add_job("a", "a.png")
+        # incomplete job files are ignored
+        (self.spool_dir / "c.tmp").touch()
+
+        claimed = cli._claim_next_job(self.spool_dir)
+        self.assertEqual(claimed.name, "a.yaml.running")
+        self.assertEqual(self.spool_files(), ["a.yaml.running", "b.yaml", "c.tmp"])
+        # a job claimed by another worker
+        self.assertIsNone(cli._claim_job(self.spool_dir / "a.yaml"))
+
+    def test_run_jobs(self):
+        worker = StubWorker()
+        self.assertTrue(
+            cli.run_spool_job(worker, cli._claim_job(self.add_job("a", "a.png")))
+        )
+        self.assertFalse(
+            cli.run_spool_job(worker, cli._claim_job(self.add_job("b", "fail")))
+        )
+        self.assertEqual(worker.jobs, [(["frame.npz"], "a.png")])
+        self.assertEqual(self.spool_files(), ["a.yaml.done", "b.yaml.failed"])
+        self.assertEqual(
+            (self.spool_dir / "b.yaml.failed").read_text(),
+            "RuntimeError: render failed\n",
+        )
+
+    def test_serve(self):
+        self.add_job("a", "a.png")
+        self.add_job("b", "b.png")
+        with mock.patch.object(cli, "RenderWorker", StubWorker):
+            self.assertEqual(cli.serve(str(self.spool_dir), max_jobs=2), 2)
+            (self.spool_dir / "stop").touch()
+            self.add_job("c", "c.png")
+            # stops before claiming
+            self.assertEqual(cli.serve(str(self.spool_dir)), 0)
+        self.assertEqual(
+            self.spool_files(), ["a.yaml.done", "b.yaml.done", "c.yaml", "stop"]
+        )
+
+
+# `serve` stand-in that appends a line to the output of every job. The first
+# process that sees a job exits before claiming it.
+FAKE_SERVER = """
+import os, pathlib, sys, time
+from ruamel.yaml import YAML
+
+spool_dir = pathlib.Path(sys.argv[1])
+while not (spool_dir / "stop").exists():
+    jobs = sorted(spool_dir.glob("*.yaml"))
+    if not jobs:
+        time.sleep(0.01)
+        continue
+    crashed = spool_dir.parent / "crashed"
+    if not crashed.exists():
+        crashed.touch()
+        os._exit(1)
+    running = jobs[0].with_name(jobs[0].name + ".running")
+    jobs[0].rename(running)
+    with open(YAML(typ="safe").load(running)["output"], "a") as f:
+        f.write("rendered\\n")
+    running.rename(jobs[0].with_name(jobs[0].name + ".done"))
+"""
+
+
+def start_fake_server(worker):
+    worker.spool_dir.mkdir(parents=True, exist_ok=True)
+    worker.process = subprocess.Popen(
+        [sys.executable, "-c", FAKE_SERVER, str(worker.spool_dir)]
+    )
+
+
+class TestRenderSequenceParallel(unittest.TestCase):
+    def test_crashed_worker(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = str(pathlib.Path(tmp_dir) / "{stem}.txt")
+            filenames = ["a.npz", "b.npz"]
+            with mock.patch.object(cli._WorkerProcess, "start", start_fake_server):
+                failed = cli.render_sequence_parallel(
+                    None, filenames, output, num_workers=2, poll_interval=0.01
+                )
+            self.assertEqual(failed, [])
+            # the job of the crashed process is not rendered again by its restart
+            for stem in ("a", "b"):
+                self.assertEqual(
+                    pathlib.Path(output.format(stem=stem)).read_text(), "rendered\n"
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
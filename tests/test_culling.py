@@ -0,0 +1,53 @@
+import unittest
+
+import bpy
+import numpy as np
+
+from blender_kitti.culling import visible_mask
+from blender_kitti.scene_setup import create_camera_top_view_ortho
+
+
+class TestCulling(unittest.TestCase):
+    def setUp(self):
+        self.scene = bpy.data.scenes.new("test_culling")
+        self.scene.render.resolution_x = 320
+        self.scene.render.resolution_y = 180
+        # 20 x 11.25 meters around the origin
+        self.camera = create_camera_top_view_ortho(scale=20.0)
+        self.scene.collection.objects.link(self.camera)
+
+    def tearDown(self):
+        bpy.data.objects.remove(self.camera)
+        bpy.data.scenes.remove(self.scene)
+
+    def test_frustum(self):
+        points = np.array([[0.0, 0.0, 0.0], [9.9, 5.5, 0.0], [12.0, 0.0, 0.0]])
+        np.testing.assert_array_equal(
+            visible_mask(self.scene, points), [True, True, False]
+        )
+        # the particle reaches into the image
+        np.testing.assert_array_equal(
+            visible_mask(self.scene, points, radius=2.5), [True, True, True]
+        )
+
+    def test_occlusion(self):
+        wall = np.stack(
+            np.meshgrid(np.linspace(-3, 3, 31), np.linspace(-3, 3, 31), [10.0]), -1
+        ).reshape((-1, 3))
+        behind = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 5.0], [6.0, 0.0, 0.0]])
+        points = np.concatenate([wall, behind])
+        radius = np.concatenate([np.full(len(wall), 0.8), np.full(len(behind), 0.1)])
+
+        visible = visible_mask(self.scene, points, radius, mode="occlusion")
+        self.assertTrue(visible[: len(wall)].all())
+        np.testing.assert_array_equal(visible[len(wall) :], [False, False, True])
+
+    def test_no_cameras(self):
+        bpy.data.objects.remove(self.camera)
+        self.camera = bpy.data.objects.new("no_camera", None)
+        points = np.full((5, 3), 100.0)
+        self.assertTrue(visible_mask(self.scene, points).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
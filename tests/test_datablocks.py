@@ -0,0 +1,86 @@
+import unittest
+
+import bpy
+import numpy as np
+
+from blender_kitti import add_point_cloud
+from blender_kitti.datablocks import (
+    DatablockRegistry,
+    is_datablock_alive,
+    is_shared_datablock,
+    remove_orphan_data,
+)
+from blender_kitti.scene_setup import clear_all
+
+
+def count_datablocks():
+    return {
+        k: len(getattr(bpy.data, k))
+        for k in ("objects", "meshes", "materials", "images")
+    }
+
+
+class TestDatablockRegistry(unittest.TestCase):
+    def setUp(self):
+        self.scene = bpy.data.scenes.new("test_datablocks")
+
+    def tearDown(self):
+        bpy.data.scenes.remove(self.scene)
+
+    def add_point_cloud(self, name_prefix, particle_radius=0.02):
+        points = np.random.default_rng(0).random((10, 3), dtype=np.float32)
+        colors = np.full((10, 3), 255, dtype=np.uint8)
+        _, info = add_point_cloud(
+            self.scene,
+            points=points,
+            colors=colors,
+            name_prefix=name_prefix,
+            particle_radius=particle_radius,
+        )
+        return info["obj_particle"]
+
+    def test_remove_all(self):
+        # creates the shared icosphere mesh
+        self.add_point_cloud("registry_warmup")
+        before = count_datablocks()
+        registry = DatablockRegistry()
+        with registry:
+            self.add_point_cloud("registry_a")
+        with registry:
+            self.add_point_cloud("registry_b")
+        # two objects, one instancer mesh, image and material per point cloud,
+        # the shared icosphere mesh is not recorded
+        self.assertEqual(len(registry), 10)
+
+        self.assertEqual(registry.remove_all(), 10)
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(count_datablocks(), before)
+        # names can be used again
+        with registry:
+            self.add_point_cloud("registry_a")
+        registry.remove_all()
+
+    def test_shared_mesh_survives(self):
+        registry = DatablockRegistry()
+        with registry:
+            # radius of no other test, the prototype is created in the scope
+            obj_a = self.add_point_cloud("shared_a", particle_radius=0.0123)
+        obj_b = self.add_point_cloud("shared_b", particle_radius=0.0123)
+        # two clouds share one mesh
+        self.assertEqual(obj_a.data, obj_b.data)
+        self.assertTrue(is_shared_datablock(obj_b.data))
+
+        registry.remove_all()
+        self.assertFalse(is_datablock_alive(obj_a))
+        self.assertTrue(is_datablock_alive(obj_b.data))
+
+    def test_clear_all_leaves_no_orphans(self):
+        self.add_point_cloud("clear_all")
+        clear_all()
+        self.assertEqual(len(bpy.data.objects), 0)
+        self.assertEqual(remove_orphan_data(), 0)
+        self.assertNotIn("clear_all_colors", bpy.data.images)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from blender_kitti.downsampling import downsample_point_cloud, voxel_grid_indices
+
+
+class TestDownsampling(unittest.TestCase):
+    def test_centroids_and_colors(self):
+        points = np.array(
+            [[0.1, 0.1, 0.1], [0.3, 0.1, 0.1], [0.2, 0.4, 0.1], [1.5, 0.1, 0.1]],
+            dtype=np.float32,
+        )
+        red, blue = [255, 0, 0], [0, 0, 255]
+        colors = np.array([red, red, blue, blue], dtype=np.uint8)
+
+        centroids, mean = downsample_point_cloud(points, colors, voxel_size=1.0)
+        self.assertEqual(centroids.dtype, np.float32)
+        np.testing.assert_allclose(centroids, [[0.2, 0.2, 0.1], [1.5, 0.1, 0.1]])
+        np.testing.assert_array_equal(mean, [[170, 0, 85], blue])
+
+        _, (majority,) = downsample_point_cloud(
+            points, [colors], voxel_size=1.0, color_reduction="majority"
+        )
+        np.testing.assert_array_equal(majority, [red, blue])
+
+    def test_max_points(self):
+        points = np.random.default_rng(0).random((10000, 3))
+        downsampled, _ = downsample_point_cloud(points, max_points=500)
+        self.assertLessEqual(len(downsampled), 500)
+        self.assertGreaterEqual(len(downsampled), 475)
+        # the coverage of the points is kept
+        np.testing.assert_allclose(downsampled.min(axis=0), 0.0, atol=0.1)
+        np.testing.assert_allclose(downsampled.max(axis=0), 1.0, atol=0.1)
+
+    def test_voxel_grid_indices(self):
+        points = np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5], [2.0, 0.0, 0.0]])
+        inverse, num_voxels = voxel_grid_indices(points, 1.0)
+        self.assertEqual(num_voxels, 2)
+        self.assertEqual(inverse[0], inverse[1])
+        self.assertNotEqual(inverse[0], inverse[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import colorsys
+import unittest
+
+import numpy as np
+
+from blender_kitti.flow_colors import flow_colors, hsv_to_rgb
+
+
+class TestFlowColors(unittest.TestCase):
+    def test_hsv_to_rgb(self):
+        hsv = np.random.default_rng(0).random((1000, 3))
+        hsv[:7, 0] = np.arange(7) / 6.0
+        expected = [colorsys.hsv_to_rgb(*c) for c in hsv]
+        np.testing.assert_allclose(hsv_to_rgb(hsv), expected, atol=1e-12)
+
+    def test_hsv_flow(self):
+        flow = np.array([[-2.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+        colors = flow_colors(flow, alpha=0.5)
+        self.assertEqual(colors.dtype, np.float32)
+        # hue 0 (red) for -x, saturation from the magnitude, no flow is white
+        np.testing.assert_allclose(
+            colors, [[1, 0, 0, 0.5], [0.5, 1, 1, 0.5], [1, 1, 1, 0.5]], atol=1e-6
+        )
+
+    def test_middlebury(self):
+        flow = np.array([[1.0, 0.0], [0.5, 0.0], [2.0, 0.0]])
+        colors = flow_colors(flow, color_wheel="middlebury", max_magnitude=1.0)
+        # +x flow is red, desaturated for smaller and darkened for larger flow
+        np.testing.assert_allclose(
+            colors[:, :3], [[1, 0, 0], [1, 0.5, 0.5], [0.75, 0, 0]], atol=1e-6
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from blender_kitti.furthest_point_sampling import (
+    furthest_point_sampling,
+    furthest_point_sampling_thresh,
+)
+
+
+def naive_furthest_point_sampling(points, num_samples, start_index):
+    samples = [start_index]
+    distances = np.full(len(points), np.inf)
+    for _ in range(num_samples - 1):
+        delta = points - points[samples[-1]]
+        distances = np.minimum(distances, (delta**2).sum(axis=1))
+        samples.append(int(np.argmax(distances)))
+    return np.array(samples)
+
+
+class TestFurthestPointSampling(unittest.TestCase):
+    def setUp(self):
+        self.points = np.random.default_rng(0).normal(size=(2000, 3))
+
+    def test_same_as_naive(self):
+        indices = furthest_point_sampling(self.points, 200, start_index=7)
+        np.testing.assert_array_equal(
+            indices, naive_furthest_point_sampling(self.points, 200, 7)
+        )
+
+    def test_seed(self):
+        a = furthest_point_sampling(self.points, 50, seed=1)
+        b = furthest_point_sampling(self.points, 50, seed=1)
+        np.testing.assert_array_equal(a, b)
+        self.assertEqual(len(np.unique(a)), 50)
+
+    def test_thresh(self):
+        indices = furthest_point_sampling_thresh(self.points, 0.5)
+        samples = self.points[indices]
+        # every point is close to a sample, all samples are far from each other
+        distances = np.linalg.norm(self.points[:, None] - samples[None], axis=-1)
+        self.assertLess(distances.min(axis=1).max(), 0.5)
+        pairwise = np.linalg.norm(samples[:, None] - samples[None], axis=-1)
+        np.fill_diagonal(pairwise, np.inf)
+        self.assertGreaterEqual(pairwise.min(), 0.5)
+
+        limited = furthest_point_sampling_thresh(self.points, 0.5, max_samples=10)
+        np.testing.assert_array_equal(limited, indices[:10])
+
+
+if __name__ == "__main__":
+    unittest.main()
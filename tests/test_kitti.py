@@ -0,0 +1,62 @@
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+
+from blender_kitti.kitti import (
+    SemanticKittiSequence,
+    read_velodyne_scan,
+    read_voxel_grid,
+    scan_xyz,
+    split_semantic_label,
+)
+
+
+class TestKittiReaders(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sequence_dir = pathlib.Path(self.tmp_dir.name) / "08"
+        (self.sequence_dir / "velodyne").mkdir(parents=True)
+        (self.sequence_dir / "labels").mkdir()
+
+        rng = np.random.default_rng(0)
+        self.scans = [rng.random((n, 4), dtype=np.float32) for n in (5, 0, 7)]
+        for i, scan in enumerate(self.scans):
+            scan.tofile(self.sequence_dir / "velodyne" / "{:06d}.bin".format(i))
+        self.label = np.array([10 | (3 << 16), 40, 252 | (1 << 16)], dtype=np.uint32)
+        self.label.tofile(self.sequence_dir / "labels" / "000002.label")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_scan(self):
+        scan = read_velodyne_scan(self.sequence_dir / "velodyne" / "000000.bin")
+        self.assertIsInstance(scan, np.memmap)
+        np.testing.assert_array_equal(scan, self.scans[0])
+        self.assertTrue(np.shares_memory(scan_xyz(scan), scan))
+
+    def test_split_label(self):
+        semantic, instance = split_semantic_label(self.label)
+        np.testing.assert_array_equal(semantic, [10, 40, 252])
+        np.testing.assert_array_equal(instance, [3, 0, 1])
+
+    def test_packed_voxel_grid(self):
+        grid = np.random.default_rng(1).random((4, 4, 8)) > 0.5
+        filepath = pathlib.Path(self.tmp_dir.name) / "000000.invalid"
+        np.packbits(grid).tofile(filepath)
+        np.testing.assert_array_equal(
+            read_voxel_grid(filepath, packed=True, shape=grid.shape), grid
+        )
+
+    def test_sequence(self):
+        sequence = SemanticKittiSequence(self.sequence_dir)
+        self.assertEqual(len(sequence), 3)
+        frames = list(sequence)
+        self.assertEqual([len(f["scan"]) for f in frames], [5, 0, 7])
+        self.assertNotIn("label", frames[0])
+        np.testing.assert_array_equal(frames[2]["label"], self.label)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import math
+import unittest
+
+import bpy
+import numpy as np
+
+from blender_kitti import add_point_cloud, update_point_cloud
+from blender_kitti.lod import (
+    auto_icosphere_subdivisions,
+    billboard_corners,
+    lod_levels,
+    pixels_per_meter,
+)
+
+
+class TestLod(unittest.TestCase):
+    def setUp(self):
+        self.scene = bpy.data.scenes.new("test_lod")
+        self.scene.render.resolution_x = 1920
+        self.scene.render.resolution_y = 1080
+        self.scene.render.resolution_percentage = 100
+        # looks along -z from (0, 0, 10), 50 mm lens on a 36 mm sensor
+        camera_data = bpy.data.cameras.new("test_lod_camera")
+        camera_data.lens = 50.0
+        camera_data.sensor_width = 36.0
+        self.camera = bpy.data.objects.new("test_lod_camera", camera_data)
+        self.camera.location = (0.0, 0.0, 10.0)
+        self.scene.collection.objects.link(self.camera)
+        self.scene.camera = self.camera
+        # focal length in pixels
+        self.focal_length_px = 50.0 / 36.0 * 1920
+
+    def tearDown(self):
+        camera_data = self.camera.data
+        bpy.data.objects.remove(self.camera)
+        bpy.data.cameras.remove(camera_data)
+        bpy.data.scenes.remove(self.scene)
+
+    def test_pixels_per_meter(self):
+        points = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, -10.0], [3.0, 4.0, 10.0]])
+        np.testing.assert_allclose(
+            pixels_per_meter(self.scene, self.camera, points),
+            self.focal_length_px / np.array([10.0, 20.0, 5.0]),
+        )
+
+        self.camera.data.type = "ORTHO"
+        self.camera.data.ortho_scale = 20.0
+        np.testing.assert_allclose(
+            pixels_per_meter(self.scene, self.camera, points), 1920 / 20.0
+        )
+
+    def test_auto_icosphere_subdivisions(self):
+        # 5.3 px radius: the icosahedron is too coarse for 0.5 px tolerance
+        points = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, -90.0]])
+        self.assertEqual(auto_icosphere_subdivisions(self.scene, points, 0.02), 2)
+        # the closest point decides, capped at 3
+        self.assertEqual(auto_icosphere_subdivisions(self.scene, points, 1.0), 3)
+
+        self.scene.camera = None
+        self.assertEqual(auto_icosphere_subdivisions(self.scene, points, 0.02), 3)
+
+    def test_lod_levels(self):
+        # 53 px, 5.3 px and 0.5 px radius on screen
+        points = np.array([[0.0, 0.0, 9.0], [0.0, 0.0, 0.0], [0.0, 0.0, -90.0]])
+        np.testing.assert_array_equal(
+            lod_levels(self.scene, self.camera, points, 0.02), [3, 2, 0]
+        )
+
+    def test_billboard_corners(self):
+        radius = 0.5
+        half_size = 0.5 * math.sqrt(math.pi) * radius
+        corners = billboard_corners(self.camera, radius)
+        np.testing.assert_allclose(
+            corners,
+            half_size * np.array([[-1, -1, 0], [1, -1, 0], [1, 1, 0], [-1, 1, 0]]),
+            atol=1e-12,
+        )
+        # same area as the disk
+        self.assertAlmostEqual(
+            np.linalg.norm(corners[1] - corners[0]) ** 2, math.pi * radius**2
+        )
+
+        # camera looking along -x, its x-axis is world y and its y-axis world z
+        self.camera.rotation_euler = (math.pi / 2, 0.0, math.pi / 2)
+        np.testing.assert_allclose(
+            billboard_corners(self.camera, radius),
+            half_size * np.array([[0, -1, -1], [0, 1, -1], [0, 1, 1], [0, -1, 1]]),
+            atol=1e-6,
+        )
+
+    def test_point_cloud_lod(self):
+        points = np.array([[0.0, 0.0, 9.0], [0.0, 0.0, 0.0], [0.0, 0.0, -90.0]])
+        obj_lod, info = add_point_cloud(
+            self.scene, points=points, name_prefix="test_lod", subdivisions="lod"
+        )
+        self.assertEqual(obj_lod.type, "EMPTY")
+        self.assertEqual(len(info["obj_instancers"]), 3)
+        for obj_instancer in info["obj_instancers"]:
+            self.assertEqual(obj_instancer.parent, obj_lod)
+        with self.assertRaises(ValueError):
+            update_point_cloud(obj_lod, points=points)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import pathlib
+import tempfile
+import unittest
+import zipfile
+
+import numpy as np
+
+from blender_kitti.npz import LazyNpzArray, _memmap_npz_member, load_lazy_arrays
+
+
+class TestLazyNpzArray(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.arrays = {
+            "points": rng.random((7, 3), dtype=np.float32),
+            "fortran": np.asfortranarray(rng.integers(0, 9, (4, 5), dtype=np.int16)),
+        }
+        self.stored = str(pathlib.Path(self.tmp_dir.name) / "stored.npz")
+        np.savez(self.stored, **self.arrays)
+        self.compressed = str(pathlib.Path(self.tmp_dir.name) / "compressed.npz")
+        np.savez_compressed(self.compressed, **self.arrays)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_memmap_stored(self):
+        with zipfile.ZipFile(self.stored) as zip_file:
+            for key, expected in self.arrays.items():
+                array = _memmap_npz_member(
+                    self.stored, zip_file, "{}.npy".format(key), "r"
+                )
+                self.assertIsInstance(array, np.memmap)
+                np.testing.assert_array_equal(array, expected)
+        self.assertTrue(array.flags.f_contiguous)
+
+    def test_compressed_fallback(self):
+        with zipfile.ZipFile(self.compressed) as zip_file:
+            self.assertIsNone(
+                _memmap_npz_member(self.compressed, zip_file, "points.npy", "r")
+            )
+        for key, expected in self.arrays.items():
+            array = LazyNpzArray(self.compressed, key, mmap_mode="r").load()
+            self.assertNotIsInstance(array, np.memmap)
+            np.testing.assert_array_equal(array, expected)
+
+    def test_load_lazy_arrays(self):
+        kwargs = {
+            "points": LazyNpzArray(self.stored, "points", mmap_mode="r"),
+            "colors": {"fortran": LazyNpzArray(self.stored, "fortran")},
+            "name_prefix": "cloud",
+        }
+        loaded = load_lazy_arrays(kwargs)
+        self.assertIsInstance(loaded["points"], np.memmap)
+        np.testing.assert_array_equal(loaded["points"], self.arrays["points"])
+        # read without mmap_mode
+        self.assertNotIsInstance(loaded["colors"]["fortran"], np.memmap)
+        np.testing.assert_array_equal(
+            loaded["colors"]["fortran"], self.arrays["fortran"]
+        )
+        self.assertEqual(loaded["name_prefix"], "cloud")
+
+
+if __name__ == "__main__":
+    unittest.main()
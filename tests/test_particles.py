@@ -0,0 +1,253 @@
+import itertools
+import unittest
+
+import bpy
+import mathutils
+import numpy as np
+
+from blender_kitti import add_flow_mesh, add_point_cloud, add_voxels, update_point_cloud
+from blender_kitti.datablocks import DatablockRegistry
+from blender_kitti.particles import (
+    COLOR_ATTRIBUTE_NAME,
+    COLOR_NAMES_PROPERTY,
+    UV_DIVIDE_NODES_PROPERTY,
+    box_corners,
+    flow_arrow_quaternions,
+    flow_arrow_rotations,
+    prepare_voxel_list,
+)
+
+# unique names across test methods
+_cloud_ids = itertools.count()
+
+
+def particle_material(obj_particle):
+    return obj_particle.material_slots[0].material
+
+
+class TestSharedMaterials(unittest.TestCase):
+    def setUp(self):
+        self.scene = bpy.data.scenes.new("test_particles")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        bpy.data.scenes.remove(self.scene)
+
+    def test_point_clouds_share_material(self):
+        materials = []
+        for name_prefix in ("shared_material_a", "shared_material_b"):
+            _, info = add_point_cloud(
+                self.scene,
+                points=self.rng.random((10, 3)),
+                colors=self.rng.integers(0, 255, (10, 3), dtype=np.uint8),
+                name_prefix=name_prefix,
+                backend="geometry_nodes",
+            )
+            materials.append(particle_material(info["obj_particle"]))
+        self.assertEqual(materials[0], materials[1])
+        self.assertNotIn("shared_material_a", materials[0].name)
+
+    def test_voxels_share_material(self):
+        materials = []
+        for name_prefix in ("shared_voxels_a", "shared_voxels_b"):
+            voxels = self.rng.random((4, 4, 4)) > 0.5
+            colors = self.rng.integers(0, 255, (4, 4, 4, 3), dtype=np.uint8)
+            add_voxels(
+                voxels=voxels,
+                colors=colors,
+                scene=self.scene,
+                name_prefix=name_prefix,
+                backend="geometry_nodes",
+            )
+            obj_particle = bpy.data.objects[name_prefix + "_cube_obj"]
+            materials.append(particle_material(obj_particle))
+        self.assertEqual(materials[0], materials[1])
+
+
+class TestUpdatePointCloud(unittest.TestCase):
+    def setUp(self):
+        self.scene = bpy.data.scenes.new("test_update_point_cloud")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        bpy.data.scenes.remove(self.scene)
+
+    def random_cloud(self, num_points):
+        points = self.rng.random((num_points, 3), dtype=np.float32)
+        colors = self.rng.integers(0, 255, (num_points, 3), dtype=np.uint8)
+        return points, colors
+
+    def add_point_cloud(self, backend, material=None):
+        points, colors = self.random_cloud(10)
+        obj_instancer, _ = add_point_cloud(
+            self.scene,
+            points=points,
+            colors=colors,
+            name_prefix="update_{}_{}".format(backend, next(_cloud_ids)),
+            backend=backend,
+            material=material,
+        )
+        return obj_instancer
+
+    def assert_updated(self, obj_instancer, points, colors):
+        mesh = obj_instancer.data
+        colors_rgba = np.concatenate([colors / 255.0, np.ones((len(colors), 1))], 1)
+        if obj_instancer.modifiers:
+            positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", positions)
+            np.testing.assert_allclose(positions.reshape((-1, 3)), points)
+            attribute = mesh.attributes[COLOR_ATTRIBUTE_NAME]
+            stored = np.empty(len(attribute.data) * 4, dtype=np.float32)
+            attribute.data.foreach_get("color_srgb", stored)
+            # converted to linear and back
+            np.testing.assert_allclose(stored.reshape((-1, 4)), colors_rgba, atol=1e-3)
+            return
+
+        # pseudo face with 3 vertices per point
+        self.assertEqual(len(mesh.vertices), 3 * len(points))
+        image = bpy.data.images[obj_instancer[COLOR_NAMES_PROPERTY][0]]
+        self.assertGreaterEqual(image.size[0] * image.size[1], len(points))
+        pixels = np.empty(len(image.pixels), dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        np.testing.assert_allclose(
+            pixels.reshape((-1, 4))[: len(points)], colors_rgba, atol=1e-6
+        )
+        name_material, name_x, name_y = obj_instancer[UV_DIVIDE_NODES_PROPERTY][0]
+        nodes = bpy.data.materials[name_material].node_tree.nodes
+        self.assertEqual(nodes[name_x].inputs[1].default_value, image.size[0])
+        self.assertEqual(nodes[name_y].inputs[1].default_value, image.size[1])
+
+    def test_update(self):
+        for backend in ("faces", "geometry_nodes"):
+            for num_points in (10, 5, 25):
+                with self.subTest(backend=backend, num_points=num_points):
+                    obj_instancer = self.add_point_cloud(backend)
+                    points, colors = self.random_cloud(num_points)
+                    update_point_cloud(obj_instancer, points=points, colors=colors)
+                    self.assert_updated(obj_instancer, points, colors)
+
+    def test_grow_with_given_material(self):
+        material = bpy.data.materials.new("update_given_material")
+        obj_instancer = self.add_point_cloud("faces", material=material)
+        points, colors = self.random_cloud(25)
+        update_point_cloud(obj_instancer, points=points, colors=colors)
+        self.assert_updated(obj_instancer, points, colors)
+
+
+class TestVoxelList(unittest.TestCase):
+    def test_voxel_size(self):
+        # cells (0, 0, 1) and (1, 2, 3) of a 2 x 3 x 4 grid
+        indices = np.array([1, 23])
+        kwargs = dict(
+            indices=indices,
+            grid_shape=np.array([2, 3, 4]),
+            grid_origin=np.array([1.0, 0.0, -1.0]),
+            colors=np.zeros((2, 3), dtype=np.uint8),
+        )
+        for voxel_size, expected in (
+            (0.5, [[1, 0, -0.5], [1.5, 1, 0.5]]),
+            (np.array([0.5]), [[1, 0, -0.5], [1.5, 1, 0.5]]),
+            (np.array([0.5, 1.0, 2.0]), [[1, 0, 1], [1.5, 2, 5]]),
+        ):
+            _, build_kwargs = prepare_voxel_list(voxel_size=voxel_size, **kwargs)
+            np.testing.assert_allclose(build_kwargs["coords"], expected)
+            self.assertAlmostEqual(build_kwargs["edge_length"], 0.4)
+
+    def test_edge_length_without_colors(self):
+        _, build_kwargs = prepare_voxel_list(
+            indices=np.array([0, 5]),
+            grid_shape=np.array([2, 3, 4]),
+            grid_origin=np.zeros(3),
+            voxel_size=0.5,
+            edge_length=0.5,
+        )
+        self.assertIsNone(build_kwargs["colors"])
+        self.assertEqual(build_kwargs["edge_length"], 0.5)
+
+
+class TestBoxCorners(unittest.TestCase):
+    def test_yaw(self):
+        positions = [[1.0, 2.0, 3.0]] * 2
+        dims = [[4.0, 2.0, 1.0]] * 2
+        corners = box_corners(positions, dims, [0.0, np.pi / 2])
+        self.assertEqual(corners.shape, (2, 8, 3))
+
+        # bottom face counter-clockwise, then the top face
+        xy_yaw_0 = [[-1, 1], [3, 1], [3, 3], [-1, 3]]
+        # length along y
+        xy_yaw_90 = [[2, 0], [2, 4], [0, 4], [0, 0]]
+        for box, xy in zip(corners, (xy_yaw_0, xy_yaw_90)):
+            np.testing.assert_allclose(box[:, :2], xy + xy, atol=1e-6)
+            np.testing.assert_allclose(box[:, 2], [2.5] * 4 + [3.5] * 4)
+
+
+class TestFlowArrowRotations(unittest.TestCase):
+    def test_rotations(self):
+        flow = np.array(
+            [
+                # parallel, antiparallel and no flow
+                [0.0, 0.0, 2.0],
+                [0.0, 0.0, -0.5],
+                [0.0, 0.0, 0.0],
+                [1.0, 0.0, 0.0],
+                [1.0, -2.0, 0.5],
+            ]
+        )
+        rotations = flow_arrow_rotations(flow)
+
+        np.testing.assert_allclose(rotations[0], np.eye(3), atol=1e-6)
+        # rotation by pi around the x-axis
+        np.testing.assert_allclose(rotations[1], np.diag([1, -1, -1]), atol=1e-6)
+        np.testing.assert_allclose(rotations[2], np.eye(3), atol=1e-6)
+        # +z to +x: rotation by pi / 2 around the y-axis
+        np.testing.assert_allclose(
+            rotations[3], [[0, 0, 1], [0, 1, 0], [-1, 0, 0]], atol=1e-6
+        )
+
+        # proper rotations mapping +z to the flow direction
+        for rotation, f in zip(rotations[[0, 1, 3, 4]], flow[[0, 1, 3, 4]]):
+            np.testing.assert_allclose(rotation @ rotation.T, np.eye(3), atol=1e-6)
+            self.assertAlmostEqual(np.linalg.det(rotation), 1.0, places=5)
+            np.testing.assert_allclose(rotation[:, 2], f / np.linalg.norm(f), atol=1e-6)
+
+
+class TestFlowInstances(unittest.TestCase):
+    def setUp(self):
+        self.registry = DatablockRegistry()
+
+    def tearDown(self):
+        self.registry.remove_all()
+
+    def test_instances(self):
+        point_cloud = np.array([[0, 0, 0], [1, 0, 0], [0, 2, 0]], dtype=np.float32)
+        flow = np.array([[0, 0, 2], [1, 0, 0], [1, -2, 0.5]], dtype=np.float32)
+        # only the scene of the context is evaluated without a window
+        with self.registry:
+            obj = add_flow_mesh(
+                point_cloud=point_cloud,
+                flow=flow,
+                scene=bpy.context.scene,
+                name_prefix="test_flow_instances",
+                mode="instances",
+            )
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        matrices = [
+            np.array(instance.matrix_world)
+            for instance in depsgraph.object_instances
+            if instance.is_instance and instance.parent.original == obj
+        ]
+        self.assertEqual(len(matrices), len(flow))
+
+        # rotated unit arrows, scaled to the flow length along their axis
+        for matrix, p, f, q in zip(
+            matrices, point_cloud, flow, flow_arrow_quaternions(flow)
+        ):
+            rotation = np.array(mathutils.Quaternion(q).to_matrix())
+            expected = rotation @ np.diag([1.0, 1.0, np.linalg.norm(f)])
+            np.testing.assert_allclose(matrix[:3, :3], expected, atol=1e-5)
+            np.testing.assert_allclose(matrix[:3, 3], p, atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import bpy
+
+from blender_kitti import scene_setup
+from blender_kitti.datablocks import is_datablock_alive
+
+
+class TestHdrWorldCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        hdr_filepath = pathlib.Path(self.tmp_dir.name) / "world.hdr"
+        image = bpy.data.images.new("test_scene_setup_hdr", 4, 2, float_buffer=True)
+        image.filepath_raw = str(hdr_filepath)
+        image.file_format = "HDR"
+        image.save()
+        bpy.data.images.remove(image)
+        self.patch_hdr = mock.patch.object(
+            scene_setup, "DEFAULT_HDR_FILEPATH", hdr_filepath
+        )
+        self.patch_hdr.start()
+        self.scenes = []
+
+    def tearDown(self):
+        for scene in self.scenes:
+            bpy.data.scenes.remove(scene)
+        self.patch_hdr.stop()
+        self.tmp_dir.cleanup()
+
+    def test_shared_world(self):
+        num_images = len(bpy.data.images)
+        for name in ("test_hdr_a", "test_hdr_b"):
+            self.scenes.append(scene_setup.setup_scene(name=name))
+        world = self.scenes[0].world
+        self.assertEqual(self.scenes[1].world, world)
+        # one environment image for both scenes
+        self.assertEqual(len(bpy.data.images), num_images + 1)
+        image = world.node_tree.nodes["Environment Texture"].image
+
+        scene_setup.clear_hdr_world_cache(remove=True)
+        self.assertFalse(is_datablock_alive(world))
+        self.assertFalse(is_datablock_alive(image))
+        self.assertEqual(len(bpy.data.images), num_images)
+
+
+if __name__ == "__main__":
+    unittest.main()
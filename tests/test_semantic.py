@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from blender_kitti.semantic import SemanticColorizer
+
+CONFIG = {
+    # bgr
+    "color_map": {0: [0, 0, 0], 10: [245, 150, 100], 252: [245, 150, 200]},
+    "learning_map": {0: 0, 10: 1, 252: 1},
+    "learning_map_inv": {0: 0, 1: 10},
+}
+
+
+class TestSemanticColorizer(unittest.TestCase):
+    def test_colors(self):
+        colorizer = SemanticColorizer.from_config(CONFIG)
+        # instance ids in the upper 16 bits are ignored
+        labels = np.array([10, 252 | (7 << 16), 0, 99], dtype=np.uint32)
+        colors = colorizer(labels)
+        self.assertEqual(colors.dtype, np.uint8)
+        np.testing.assert_array_equal(
+            colors, [[100, 150, 245], [200, 150, 245], [0, 0, 0], [0, 0, 0]]
+        )
+        # grids keep their shape
+        self.assertEqual(colorizer(np.zeros((4, 4, 2), np.uint16)).shape, (4, 4, 2, 3))
+
+    def test_learning_map(self):
+        colorizer = SemanticColorizer.from_config(
+            CONFIG, use_learning_map=True, unknown_color=(1, 2, 3)
+        )
+        labels = np.array([10, 252, 99], dtype=np.uint16)
+        np.testing.assert_array_equal(
+            colorizer(labels), [[100, 150, 245], [100, 150, 245], [1, 2, 3]]
+        )
+        np.testing.assert_array_equal(colorizer.classes(labels), [1, 1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from blender_kitti.voxel_surface import quads_to_triangles, voxel_surface_quads
+
+
+def quad_normals_and_areas(vertices, quads):
+    corners = vertices[quads]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    return normals, np.linalg.norm(normals, axis=-1)
+
+
+class TestVoxelSurface(unittest.TestCase):
+    def test_single_voxel(self):
+        voxels = np.zeros((3, 3, 3), dtype=bool)
+        voxels[1, 1, 1] = True
+        vertices, quads, colors = voxel_surface_quads(voxels, voxel_size=0.5)
+
+        self.assertEqual(quads.shape, (6, 4))
+        self.assertIsNone(colors)
+        np.testing.assert_allclose(vertices.min(axis=0), [0.25, 0.25, 0.25])
+        np.testing.assert_allclose(vertices.max(axis=0), [0.75, 0.75, 0.75])
+
+        # faces point away from the voxel center
+        normals, _ = quad_normals_and_areas(vertices, quads)
+        centers = vertices[quads].mean(axis=1)
+        self.assertTrue(((normals * (centers - 0.5)).sum(axis=-1) > 0.0).all())
+
+    def test_interior_faces_removed(self):
+        voxels = np.ones((2, 2, 2), dtype=bool)
+        _, quads, _ = voxel_surface_quads(voxels)
+        self.assertEqual(len(quads), 24)
+
+        _, quads, _ = voxel_surface_quads(voxels, greedy=True)
+        self.assertEqual(len(quads), 6)
+
+    def test_greedy_keeps_area_and_colors(self):
+        rng = np.random.default_rng(0)
+        voxels = rng.random((12, 10, 8)) < 0.6
+        colors = rng.integers(0, 2, size=(12, 10, 8, 3), dtype=np.uint8) * 255
+
+        results = [
+            voxel_surface_quads(voxels, colors, greedy=greedy)
+            for greedy in (False, True)
+        ]
+        self.assertLess(len(results[1][1]), len(results[0][1]))
+
+        def area_per_normal_and_color(vertices, quads, quad_colors):
+            normals, areas = quad_normals_and_areas(vertices, quads)
+            keys = np.concatenate(
+                (np.round(normals / areas[:, None]), quad_colors), axis=-1
+            )
+            unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+            return unique_keys, np.bincount(inverse.reshape(-1), weights=areas)
+
+        keys_unit, areas_unit = area_per_normal_and_color(*results[0])
+        keys_greedy, areas_greedy = area_per_normal_and_color(*results[1])
+        np.testing.assert_array_equal(keys_unit, keys_greedy)
+        np.testing.assert_allclose(areas_unit, areas_greedy, rtol=1e-5)
+
+    def test_triangles(self):
+        voxels = np.ones((1, 1, 1), dtype=bool)
+        colors = np.full((1, 1, 1, 3), 7, dtype=np.uint8)
+        _, quads, quad_colors = voxel_surface_quads(voxels, colors)
+        triangles, triangle_colors = quads_to_triangles(quads, quad_colors)
+        self.assertEqual(triangles.shape, (12, 3))
+        self.assertEqual(triangle_colors.shape, (12, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()